@@ -3,30 +3,182 @@
 CalDAV Client Module
 Handles all CalDAV operations for iCloud calendar integration.
 """
+from __future__ import annotations
+
+import hashlib
+import importlib
 import os
+import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timezone, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Optional, Tuple
-from urllib.parse import urlparse, unquote
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from ical_utils import ICalUtils
 
-import caldav
-from caldav import DAVClient
-from caldav.elements import dav
+# caldav (and its lxml/requests stack) is imported on first use to keep server cold-start cheap
+if TYPE_CHECKING:
+    import caldav
 
 logger = logging.getLogger(__name__)
 
 ICAL_SERVER_URL = "https://caldav.icloud.com"
+CALENDARS_CACHE_TTL = 300  # seconds
+# Keep-alive pool sized for concurrent per-calendar requests (requests defaults to 10)
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+# Let niquests negotiate HTTP/2 with iCloud; set CALDAV_HTTP2=false to force HTTP/1.1
+HTTP2_ENABLED = os.environ.get("CALDAV_HTTP2", "true").strip().lower() not in ("0", "false", "no")
+# Event windows remembered for sync-token/ETag revalidation (see list_events_cached)
+WINDOW_CACHE_SIZE = 64
+# Concurrent per-calendar PROPFINDs when display names must be resolved one by one
+NAME_RESOLVE_WORKERS = 10
+# Reconnect proactively before iCloud's idle cutoff drops the session under us
+MAX_SESSION_AGE = 25 * 60  # seconds
+
+# VEVENT properties list_my_events reports, plus what client-side recurrence expansion needs
+SUMMARY_EVENT_PROPS = (
+    "UID", "SUMMARY", "DTSTART", "DTEND", "DURATION", "DESCRIPTION", "LOCATION",
+    "RRULE", "RDATE", "EXDATE", "RECURRENCE-ID",
+)
+
+# calendar-query REPORT with a partial calendar-data request (RFC 4791 §9.6)
+_SUMMARY_QUERY_TEMPLATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    '<D:prop><D:getetag/><C:calendar-data><C:comp name="VCALENDAR"><C:prop name="VERSION"/>'
+    '<C:comp name="VTIMEZONE"><C:allprop/><C:allcomp/></C:comp>'
+    '<C:comp name="VEVENT">'
+    + "".join(f'<C:prop name="{name}"/>' for name in SUMMARY_EVENT_PROPS)
+    + '</C:comp></C:comp></C:calendar-data></D:prop>'
+    '<C:filter><C:comp-filter name="VCALENDAR"><C:comp-filter name="VEVENT">'
+    '<C:time-range start="{start}" end="{end}"/>'
+    '</C:comp-filter></C:comp-filter></C:filter>'
+    '</C:calendar-query>'
+)
+
+# calendar-query REPORT returning only ETags for the same VEVENT time-range filter
+_ETAG_QUERY_TEMPLATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    '<D:prop><D:getetag/></D:prop>'
+    '<C:filter><C:comp-filter name="VCALENDAR"><C:comp-filter name="VEVENT">'
+    '<C:time-range start="{start}" end="{end}"/>'
+    '</C:comp-filter></C:comp-filter></C:filter>'
+    '</C:calendar-query>'
+)
+
+
+def _caldav_utc(value: datetime) -> str:
+    """Format a datetime as a CalDAV UTC time-range bound."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _href_key(href: object) -> str:
+    """Normalize a DAV href or absolute event URL to its unquoted path."""
+    return unquote(urlsplit(str(href)).path)
+
+
+def _event_etags(events: List[caldav.Event]) -> Optional[Dict[str, str]]:
+    """Map href -> ETag from the getetag each listed event came back with, or None if any lacks one."""
+    from caldav.elements import dav
+    
+    etags = {}
+    for event in events:
+        etag = (getattr(event, 'props', None) or {}).get(dav.GetEtag.tag)
+        if not etag:
+            return None
+        etags[_href_key(event.url)] = str(etag)
+    return etags
+
+
+def _expand_events(events: List[caldav.Event], start: datetime, end: datetime) -> List[caldav.Event]:
+    """Replace each recurring event's master with its occurrences in [start, end), like search(expand=True).
+    
+    Events with no occurrence in the window are dropped; non-recurring ones are kept untouched.
+    """
+    import recurring_ical_events
+    
+    expanded = []
+    for event in events:
+        cal_ics = event.icalendar_instance
+        if cal_ics is None:
+            continue
+        if any('RRULE' in comp or 'RDATE' in comp for comp in cal_ics.subcomponents if comp.name == 'VEVENT'):
+            occurrences = recurring_ical_events.of(cal_ics, components=["VEVENT"]).between(start, end)
+            if not occurrences:
+                continue
+            cal_ics.subcomponents = list(occurrences)
+        expanded.append(event)
+    return expanded
+
+
+def _http_lib_errors(http_lib: str) -> Tuple[type, ...]:
+    """Connection/timeout exception types of an HTTP library (requests or niquests), if importable."""
+    try:
+        exceptions = importlib.import_module(f"{http_lib}.exceptions")
+        return exceptions.ConnectionError, exceptions.Timeout
+    except (ImportError, AttributeError):
+        return ()
+
+
+def _adapter_settings(adapter: object) -> Dict[str, object]:
+    """Constructor arguments that rebuild an HTTPAdapter as configured (retries, resolver, QUIC cache, TLS...).
+    
+    requests and niquests keep each argument as an attribute of the same name, usually underscored.
+    """
+    import inspect
+    
+    settings = {}
+    for name, param in inspect.signature(type(adapter).__init__).parameters.items():
+        if name == "self" or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        for attr in (f"_{name}", name):
+            if hasattr(adapter, attr):
+                settings[name] = getattr(adapter, attr)
+                break
+    return settings
+
+
+def _credentials_key(email: Optional[str], password: Optional[str]) -> bytes:
+    """Fingerprint the credentials a session was built with, without keeping them as a key."""
+    return hashlib.blake2b(f"{email}\0{password}".encode('utf-8'), digest_size=16).digest()
 
 
 class CalDAVClient:
     """CalDAV client for iCloud calendar operations."""
     
+    __slots__ = (
+        'email', 'password', 'client', 'principal',
+        '_calendars_cache', '_calendars_cache_ts', '_name_cache',
+        '_connected_at', '_lock', '_calendar_lookup', '_credentials_key', '_window_cache',
+        '_calendar_index', '_transport_exc',
+    )
+    
     def __init__(self):
         self.email = None
         self.password = None
         self.client = None
         self.principal = None
+        self._calendars_cache: Optional[List[caldav.Calendar]] = None
+        self._calendars_cache_ts: float = 0
+        self._name_cache: Dict[str, str] = {}
+        self._connected_at: Optional[float] = None
+        self._calendar_lookup: Dict[str, Tuple[float, caldav.Calendar]] = {}
+        self._credentials_key: Optional[bytes] = None
+        # (calendar URL, UTC start, UTC end) -> (sync-token, href -> ETag, parsed events), most recently used last
+        self._window_cache: OrderedDict = OrderedDict()
+        # (calendar list it was built from, by URL, by lowercased name)
+        self._calendar_index: Optional[Tuple[list, Dict[str, caldav.Calendar], Dict[str, caldav.Calendar]]] = None
+        # Connection/timeout exception types of the HTTP library caldav built its session on
+        self._transport_exc: Optional[Tuple[type, ...]] = None
+        self._lock = threading.Lock()
         
     def _get_credentials(self) -> Tuple[str, str]:
         """Get iCloud credentials from environment variables."""
@@ -40,19 +192,178 @@ class CalDAVClient:
             )
         return email, password
     
-    def connect(self) -> bool:
-        """Establish connection to iCloud CalDAV server."""
+    def connect(self, force: bool = False) -> bool:
+        """Establish connection to iCloud CalDAV server, reusing the live session when possible."""
+        with self._lock:
+            if not force and self._session_is_fresh():
+                return True
+            try:
+                self.email, self.password = self._get_credentials()
+                self.invalidate_calendars_cache()
+                key = _credentials_key(self.email, self.password)
+                # A session pre-warmed by warm_up() for the same credentials already holds a TLS connection
+                if not (self.client is not None and self.principal is None and self._credentials_key == key):
+                    # Other tool threads may still be mid-request on the old client, so swap it out
+                    # without closing it; it is garbage-collected once they finish
+                    self._new_client()
+                # Principal discovery is an authenticated PROPFIND, so it doubles as the credential check;
+                # calendars are fetched by the first call that needs them
+                self.principal = self.client.principal()
+                self._credentials_key = key
+                self._connected_at = time.monotonic()
+                logger.info("✓ Successfully connected to iCloud CalDAV for %s", self.email)
+                return True
+            except Exception as e:
+                self.reset()
+                logger.error("❌ Failed to connect to iCloud CalDAV: %s", e)
+                return False
+    
+    def _session_is_fresh(self) -> bool:
+        """Whether the session exists, is younger than MAX_SESSION_AGE and matches the configured credentials."""
+        return (
+            self.client is not None
+            and self.principal is not None
+            and self._connected_at is not None
+            and time.monotonic() - self._connected_at < MAX_SESSION_AGE
+            and self._credentials_key == _credentials_key(
+                os.environ.get("ICLOUD_EMAIL"), os.environ.get("ICLOUD_PASSWORD")
+            )
+        )
+    
+    def ensure_connected(self) -> None:
+        """Connect if needed, raising ConnectionError when the server can't be reached."""
+        if not self.connect():
+            raise ConnectionError("Failed to connect to CalDAV server")
+    
+    def invalidate_on_error(self, exc: BaseException) -> None:
+        """Drop the session after transport or auth failures so the next call reconnects.
+        
+        A 404 keeps the session but forgets cached calendars, since a calendar we
+        resolved earlier may have been deleted or moved.
+        """
+        if self.is_session_error(exc):
+            self.reset()
+            return
         try:
-            self.email, self.password = self._get_credentials()
-            self.client = DAVClient(url=ICAL_SERVER_URL, username=self.email, password=self.password)
-            self.principal = self.client.principal()
-            # Test connection
-            _ = self.principal.calendars()
-            logger.info(f"✓ Successfully connected to iCloud CalDAV for {self.email}")
+            from caldav.lib.error import NotFoundError
+        except ImportError:
+            return
+        if isinstance(exc, NotFoundError):
+            self.invalidate_calendars_cache()
+    
+    def is_session_error(self, exc: BaseException) -> bool:
+        """Whether the failure means the session itself is unusable (transport or auth)."""
+        if isinstance(exc, (ConnectionError, TimeoutError)):
             return True
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to iCloud CalDAV: {e}")
+        try:
+            from caldav.lib.error import AuthorizationError
+        except ImportError:
             return False
+        return isinstance(exc, (AuthorizationError, *self._transport_errors()))
+    
+    def _transport_errors(self) -> Tuple[type, ...]:
+        """Connection/timeout exception types of the HTTP library behind the session.
+        
+        niquests' exceptions do not subclass requests', so match whichever caldav picked.
+        The types are recorded when the client is built and survive reset(), because
+        failures are usually classified after the failing session has been dropped.
+        """
+        if self._transport_exc is not None:
+            return self._transport_exc
+        return _http_lib_errors("niquests") + _http_lib_errors("requests")
+    
+    def _configure_http_session(self) -> None:
+        """Swap the DAVClient session's HTTPS adapter for one with a larger keep-alive pool.
+        
+        caldav 2.x always uses requests; caldav 3.x uses niquests when installed, which
+        negotiates HTTP/2 via ALPN so calendar requests share one multiplexed TLS connection.
+        """
+        session = getattr(self.client, "session", None)
+        if session is None or not hasattr(session, "mount"):
+            return
+        http_lib = type(session).__module__.split('.', 1)[0]
+        http2 = http_lib == "niquests" and HTTP2_ENABLED
+        try:
+            current = session.get_adapter("https://")
+            options = _adapter_settings(current)
+            options.update(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            if http_lib == "niquests":
+                options["disable_http2"] = not HTTP2_ENABLED
+            # Same adapter class as the session's own, so it stays on the session's library
+            session.mount("https://", type(current)(**options))
+        except Exception as e:
+            logger.warning("Could not configure CalDAV HTTP session: %s", e)
+        logger.info("CalDAV HTTP client: %s (HTTP/2 %s)", http_lib, "enabled" if http2 else "off")
+    
+    def _new_client(self) -> None:
+        """Build the DAVClient; it keeps a persistent HTTP session, so TLS and auth are paid once per process."""
+        from caldav import DAVClient
+        
+        self.client = DAVClient(url=ICAL_SERVER_URL, username=self.email, password=self.password)
+        session = getattr(self.client, "session", None)
+        if session is not None:
+            self._transport_exc = _http_lib_errors(type(session).__module__.split('.', 1)[0])
+        self._configure_http_session()
+    
+    def warm_up(self) -> None:
+        """Open the pooled TLS connection to iCloud ahead of the first tool call.
+        
+        Only DNS, TCP and TLS are paid here (one OPTIONS request); principal
+        discovery still happens lazily in connect(), which reuses this session.
+        """
+        with self._lock:
+            if self.client is not None:
+                return
+            try:
+                self.email, self.password = self._get_credentials()
+                self._new_client()
+                self._credentials_key = _credentials_key(self.email, self.password)
+                self.client.session.request("OPTIONS", ICAL_SERVER_URL, timeout=10)
+                logger.info("✓ Pre-warmed connection to %s", ICAL_SERVER_URL)
+            except Exception as e:
+                logger.warning("Could not pre-warm CalDAV connection: %s", e)
+    
+    def _close_client(self) -> None:
+        """Close and forget the current DAVClient, if any."""
+        client = self.client
+        self.client = None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+    
+    def reset(self) -> None:
+        """Drop the current session so the next connect() builds a fresh one."""
+        self.principal = None
+        self._connected_at = None
+        self._credentials_key = None
+        self.invalidate_calendars_cache()
+        self._close_client()
+    
+    def _get_cached_calendars(self, ttl: float = CALENDARS_CACHE_TTL) -> List[caldav.Calendar]:
+        """Return the principal's calendars, reusing the cached list while it is fresh."""
+        if self._calendars_cache is not None and time.monotonic() - self._calendars_cache_ts < ttl:
+            return self._calendars_cache
+        try:
+            calendars = self.principal.calendars()
+        except Exception:
+            # A failed PROPFIND usually means a dead session or revoked auth; reconnect next time
+            self.reset()
+            raise
+        self._calendars_cache = calendars
+        self._calendars_cache_ts = time.monotonic()
+        self._prefetch_display_names(calendars)
+        return calendars
+    
+    def invalidate_calendars_cache(self) -> None:
+        """Drop the cached calendar list so the next lookup hits the server."""
+        self._calendars_cache = None
+        self._calendars_cache_ts = 0
+        self._name_cache.clear()
+        self._calendar_lookup.clear()
+        self._window_cache.clear()
+        self._calendar_index = None
     
     def get_calendars(self) -> List[Dict[str, str]]:
         """Get list of all calendars."""
@@ -60,7 +371,8 @@ class CalDAVClient:
             raise ValueError("Not connected to CalDAV server")
             
         try:
-            calendars = self.principal.calendars()
+            calendars = self._get_cached_calendars()
+            self._resolve_missing_display_names(calendars)
             results = []
             for cal in calendars:
                 results.append({
@@ -69,108 +381,373 @@ class CalDAVClient:
                 })
             return results
         except Exception as e:
-            logger.error(f"❌ Failed to get calendars: {e}")
+            self.invalidate_calendars_cache()
+            logger.error("❌ Failed to get calendars: %s", e)
             raise
     
-    def _get_calendar_display_name(self, cal: caldav.Calendar) -> str:
-        """Best-effort retrieval of a calendar's display name."""
-        try:
-            if getattr(cal, "name", None):
-                return cal.name
-        except Exception:
-            pass
+    def _prefetch_display_names(self, calendars: List[caldav.Calendar]) -> None:
+        """Resolve missing display names with one Depth:1 PROPFIND on the calendar home.
+        
+        Calendars listed by caldav usually carry their name already; this covers the
+        ones that don't without issuing a separate PROPFIND per calendar.
+        """
+        missing = [cal for cal in calendars if not getattr(cal, "name", None)]
+        if not missing:
+            return
+        parent = getattr(missing[0], "parent", None)
+        if parent is None:
+            return
+        from caldav.elements import dav
         try:
-            props = cal.get_properties([dav.DisplayName()])
-            if isinstance(props, dict):
-                for key, val in props.items():
-                    key_tag = getattr(key, "tag", str(key))
-                    if isinstance(key_tag, str) and key_tag.endswith("}displayname"):
-                        return str(val)
-        except Exception:
-            pass
+            response = parent._query_properties([dav.DisplayName()], depth=1)
+            props_by_href = response.expand_simple_props([dav.DisplayName()])
+        except Exception as e:
+            logger.warning("Failed to batch-fetch calendar display names: %s", e)
+            return
+        names_by_path: Dict[str, str] = {}
+        for href, props in props_by_href.items():
+            name = props.get(dav.DisplayName.tag) if isinstance(props, dict) else None
+            if name:
+                names_by_path[unquote(str(href)).rstrip('/')] = str(name)
+        for cal in missing:
+            try:
+                name = names_by_path.get(unquote(cal.url.path).rstrip('/'))
+            except Exception:
+                continue
+            if name:
+                self._name_cache[str(cal.url)] = name
+    
+    def _resolve_missing_display_names(self, calendars: List[caldav.Calendar]) -> None:
+        """Resolve names the batch PROPFIND missed concurrently instead of one PROPFIND at a time."""
+        missing = [cal for cal in calendars if str(getattr(cal, "url", "") or id(cal)) not in self._name_cache]
+        if len(missing) < 2:
+            return
+        with ThreadPoolExecutor(max_workers=min(NAME_RESOLVE_WORKERS, len(missing))) as executor:
+            list(executor.map(self._get_calendar_display_name, missing))
+    
+    def _get_calendar_display_name(self, cal: caldav.Calendar) -> str:
+        """Best-effort retrieval of a calendar's display name, memoized per calendar URL."""
+        cache_key = str(getattr(cal, "url", "") or id(cal))
+        cached = self._name_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        name = self._resolve_calendar_display_name(cal)
+        self._name_cache[cache_key] = name
+        return name
+    
+    def _resolve_calendar_display_name(self, cal: caldav.Calendar) -> str:
+        """Resolve a calendar's display name, falling back to a PROPFIND and then the URL."""
+        from caldav.elements import dav
+        from caldav.lib.error import DAVError
+        
         try:
-            return str(cal.url)
-        except Exception:
-            return "Unnamed Calendar"
+            # on caldav 3.x ``name`` is itself a (cached) PROPFIND property
+            name = getattr(cal, "name", None)
+            if name:
+                return name
+            props = cal.get_properties([dav.DisplayName()]) or {}
+        except (AttributeError, DAVError, OSError) as e:
+            # requests/niquests connection errors subclass OSError
+            logger.debug("Display name PROPFIND failed for %s: %s", getattr(cal, "url", cal), e)
+            props = {}
+        for key, val in props.items():
+            if str(getattr(key, "tag", key)).endswith("}displayname") and val:
+                return str(val)
+        return str(getattr(cal, "url", None) or "Unnamed Calendar")
     
     def find_calendar(self, calendar_url: Optional[str] = None, calendar_name: Optional[str] = None) -> caldav.Calendar:
-        """Find a calendar by URL or name."""
+        """Find a calendar by URL or name, remembering each resolved lookup for the cache TTL."""
         if not self.principal:
             raise ValueError("Not connected to CalDAV server")
-            
-        calendars = self.principal.calendars()
         
         if calendar_url:
-            for cal in calendars:
-                try:
-                    if str(cal.url) == calendar_url:
-                        return cal
-                except Exception:
-                    pass
+            key = f"url:{calendar_url}"
+        elif calendar_name:
+            key = f"name:{calendar_name.strip().lower()}"
+        else:
+            key = "default"
+        hit = self._calendar_lookup.get(key)
+        if hit is not None and time.monotonic() - hit[0] < CALENDARS_CACHE_TTL:
+            return hit[1]
+        
+        cal = self._find_calendar_uncached(calendar_url, calendar_name)
+        self._calendar_lookup[key] = (time.monotonic(), cal)
+        return cal
+    
+    def _find_calendar_uncached(self, calendar_url: Optional[str], calendar_name: Optional[str]) -> caldav.Calendar:
+        """Resolve a calendar against the (TTL-cached) calendar list, refreshing it once on a miss."""
+        calendars = self._get_cached_calendars()
+        
+        if not calendar_url and not calendar_name:
+            # Default to the first calendar if present
+            if calendars:
+                return calendars[0]
+            raise ValueError("No calendars found for this account.")
+        
+        for refresh in (False, True):
+            if refresh:
+                # The calendar may have been created since the list was cached
+                calendars = self._get_cached_calendars(ttl=0)
+            by_url, by_name = self._calendar_indexes(calendars)
+            if calendar_url:
+                cal = by_url.get(calendar_url)
+            else:
+                cal = by_name.get(calendar_name.strip().lower())
+            if cal is not None:
+                return cal
+        
+        if calendar_url:
             raise ValueError("Calendar with the provided URL was not found.")
-            
-        if calendar_name:
-            name_lower = calendar_name.strip().lower()
-            for cal in calendars:
-                if self._get_calendar_display_name(cal).strip().lower() == name_lower:
-                    return cal
-            raise ValueError("Calendar with the provided name was not found.")
-            
-        # Default to the first calendar if present
-        if calendars:
-            return calendars[0]
-        raise ValueError("No calendars found for this account.")
+        raise ValueError("Calendar with the provided name was not found.")
+    
+    def _calendar_indexes(self, calendars: List[caldav.Calendar]) -> Tuple[Dict[str, caldav.Calendar], Dict[str, caldav.Calendar]]:
+        """URL and lowercased-name lookups for a calendar list, built once per list fetch."""
+        index = self._calendar_index
+        if index is not None and index[0] is calendars:
+            return index[1], index[2]
+        self._resolve_missing_display_names(calendars)
+        by_url: Dict[str, caldav.Calendar] = {}
+        by_name: Dict[str, caldav.Calendar] = {}
+        for cal in calendars:
+            try:
+                by_url.setdefault(str(cal.url), cal)
+            except Exception:
+                pass
+            by_name.setdefault(self._get_calendar_display_name(cal).strip().lower(), cal)
+        self._calendar_index = (calendars, by_url, by_name)
+        return by_url, by_name
+    
+    def list_events_range(self, cal: caldav.Calendar, start: datetime, end: datetime) -> List[caldav.Event]:
+        """Fetch events overlapping [start, end) with a single calendar-query REPORT.
+        
+        The REPORT asks for calendar-data (and each ETag) inline, so the returned
+        events already carry their ICS payload and need no per-event GET before parsing.
+        """
+        from caldav.elements import dav
+        
+        return cal.search(
+            start=start, end=end, event=True, expand=True, split_expanded=False, props=[dav.GetEtag()]
+        )
+    
+    def list_events_summary(self, cal: caldav.Calendar, start: datetime, end: datetime) -> List[caldav.Event]:
+        """Like list_events_range, but ask the server for only the VEVENT fields listings use.
+        
+        caldav refuses (2.x) or does not expand (3.x) a hand-built query combined with
+        a date range, so the REPORT is sent as-is and recurrences are expanded here.
+        Falls back to the full-payload search if the partial calendar-data request fails.
+        """
+        import caldav
+        from caldav.elements import dav
+        
+        xml = _SUMMARY_QUERY_TEMPLATE.format(start=_caldav_utc(start), end=_caldav_utc(end))
+        try:
+            events = cal.search(xml=xml, comp_class=caldav.Event, props=[dav.GetEtag()])
+            return _expand_events(events, start, end)
+        except Exception as e:
+            logger.warning("Partial calendar-data REPORT failed, fetching full events: %s", e)
+            return self.list_events_range(cal, start, end)
+    
+    def list_events_cached(self, cal: caldav.Calendar, start: datetime, end: datetime) -> List[Dict[str, Optional[str]]]:
+        """List a window's parsed events, re-downloading them only when something in the window changed.
+        
+        The listing REPORT carries every event's ETag, so a first request costs just
+        that REPORT. For a window seen before, the collection's DAV:sync-token (RFC 6578)
+        changes on every write, so while it matches the token the window was cached
+        under, the window is served after one tiny PROPFIND. Otherwise a calendar-query
+        asking for ETags alone decides: when the same hrefs come back with the same
+        ETags the previous result is reused.
+        
+        Returns parse_event_from_ics dicts shared with the cache; callers must copy before changing them.
+        """
+        # Bounds go on the wire at whole-second UTC resolution, so key on exactly that
+        key = (str(cal.url), _caldav_utc(start), _caldav_utc(end))
+        with self._lock:
+            hit = self._window_cache.get(key)
+        
+        token = etags = None
+        if hit is not None:
+            # Read the token before any event data so a concurrent write can only make it stale, never newer
+            token = self._fetch_sync_token(cal)
+            if token is not None and hit[0] == token:
+                with self._lock:
+                    if key in self._window_cache:
+                        self._window_cache.move_to_end(key)
+                return list(hit[2])
+            etags = self._fetch_window_etags(cal, start, end)
+            if etags is not None and hit[1] == etags:
+                with self._lock:
+                    # Writes elsewhere in the calendar moved the token; this window is unchanged
+                    self._store_window(key, (token, etags, hit[2]))
+                return list(hit[2])
+        
+        events = self.list_events_summary(cal, start, end)
+        if etags is None:
+            etags = _event_etags(events)
+        # Keep only the listing fields, releasing each event's parsed payload as soon as it is read
+        parsed = []
+        while events:
+            parsed.append(ICalUtils.parse_event_from_ics(events.pop()))
+        if etags is not None:
+            with self._lock:
+                # A cold entry has no token yet; the next request stamps it after revalidating by ETag
+                self._store_window(key, (token, etags, tuple(parsed)))
+        return parsed
+    
+    def _store_window(self, key: tuple, entry: tuple) -> None:
+        """Insert a window cache entry as most recent, evicting the oldest; caller holds the lock."""
+        self._window_cache[key] = entry
+        self._window_cache.move_to_end(key)
+        while len(self._window_cache) > WINDOW_CACHE_SIZE:
+            self._window_cache.popitem(last=False)
+    
+    def _fetch_sync_token(self, cal: caldav.Calendar) -> Optional[str]:
+        """Return the calendar collection's DAV:sync-token, or None if the server has none."""
+        from caldav.elements import dav
+        from caldav.lib.error import DAVError
+        
+        try:
+            token = (cal.get_properties([dav.SyncToken()]) or {}).get(dav.SyncToken.tag)
+        except (AttributeError, DAVError, OSError) as e:
+            logger.debug("sync-token PROPFIND failed for %s: %s", cal.url, e)
+            return None
+        return str(token) if token else None
+    
+    def _fetch_window_etags(self, cal: caldav.Calendar, start: datetime, end: datetime) -> Optional[Dict[str, str]]:
+        """Map href -> ETag for the events overlapping [start, end), or None if unavailable."""
+        from caldav.elements import dav
+        
+        xml = _ETAG_QUERY_TEMPLATE.format(start=_caldav_utc(start), end=_caldav_utc(end))
+        try:
+            response = cal._query(xml, 1, "report")
+            props_by_href = response.expand_simple_props([dav.GetEtag()])
+        except Exception as e:
+            logger.warning("ETag REPORT failed, skipping event cache: %s", e)
+            return None
+        etags = {}
+        cal_path = _href_key(cal.url)
+        for href, props in props_by_href.items():
+            href_path = _href_key(href)
+            if href_path == cal_path:
+                # iCloud lists the collection itself alongside its members
+                continue
+            etag = props.get(dav.GetEtag.tag) if isinstance(props, dict) else None
+            if not etag:
+                # Without an ETag for every event the window cannot be validated
+                return None
+            etags[href_path] = str(etag)
+        return etags
     
     def get_event_by_url_or_uid(self, cal: caldav.Calendar, event_url: Optional[str] = None, uid: Optional[str] = None) -> caldav.Event:
-        """Get an event by URL or UID."""
-        # Prefer UID when available
+        """Get an event of `cal` by URL or UID.
+        
+        Only a missing event moves on to the next lookup; transport and auth errors propagate.
+        """
+        from caldav.lib.error import NotFoundError
+        
+        # Prefer the URL: a direct GET is one round-trip and needs no UID search REPORT
+        resolved = self._resolve_event_url(cal, event_url)
+        if resolved is not None:
+            import caldav
+            
+            url, in_calendar = resolved
+            # Listings span every calendar, so a URL outside `cal` is still fetched on the same session
+            event = caldav.Event(client=self.client, url=url, parent=cal if in_calendar else None)
+            try:
+                event.load()
+                return event
+            except NotFoundError:
+                pass
+        
         if uid:
             try:
                 return cal.event_by_uid(uid)
-            except Exception:
+            except NotFoundError:
                 pass
                 
         # Derive UID from URL for iCloud (filename is UID)
         if event_url:
             uid_guess = self._uid_from_event_url(event_url)
-            if uid_guess:
+            if uid_guess and uid_guess != uid:
                 try:
                     return cal.event_by_uid(uid_guess)
-                except Exception:
+                except NotFoundError:
                     pass
-            # Fallback: attempt constructing by absolute URL
-            try:
-                return caldav.Event(client=self.client, url=event_url)
-            except Exception:
-                pass
                 
         raise ValueError("Event not found by URL or UID.")
     
-    def _uid_from_event_url(self, event_url: Optional[str]) -> Optional[str]:
-        """Extract UID from iCloud event URL."""
+    def _resolve_event_url(self, cal: caldav.Calendar, event_url: Optional[str]) -> Optional[Tuple[str, bool]]:
+        """Resolve an event URL against `cal`'s server as (absolute URL, whether it lies inside `cal`).
+        
+        None for an empty URL or one on a different scheme or host.
+        """
         if not event_url:
             return None
         try:
-            path = urlparse(event_url).path
-            filename = path.rsplit('/', 1)[-1]
-            if filename.lower().endswith('.ics'):
-                base = filename[:-4]
-            else:
-                base = filename
-            return unquote(base)
-        except Exception:
+            resolved = cal.url.join(event_url)
+        except ValueError:
             return None
+        cal_path = _href_key(cal.url).rstrip('/') + '/'
+        return str(resolved), _href_key(resolved).startswith(cal_path)
+    
+    def _uid_from_event_url(self, event_url: Optional[str]) -> Optional[str]:
+        """Extract UID from iCloud event URL."""
+        if not event_url:
+            return None
+        # iCloud URLs are .../calendars/<id>/<UID>.ics; slicing the tail beats a full urlparse
+        cut = len(event_url)
+        for sep in ('?', '#'):
+            idx = event_url.find(sep)
+            if 0 <= idx < cut:
+                cut = idx
+        filename = event_url[:cut].rsplit('/', 1)[-1]
+        if filename[-4:].lower() == '.ics':
+            filename = filename[:-4]
+        return unquote(filename) if '%' in filename else filename
+    
+    def put_event_data(self, event: caldav.Event, ics_bytes: bytes) -> None:
+        """PUT raw ICS over an existing event, guarded by If-Match when its ETag is known.
+        
+        Event.save() parses the payload to manage RECURRENCE-ID and SEQUENCE; callers
+        that already produced final ICS bytes skip that parse (and any str transcode).
+        """
+        from caldav.elements import dav
+        from caldav.lib.error import PutError
+        
+        headers = {"Content-Type": 'text/calendar; charset="utf-8"'}
+        # load() and REPORT results record the ETag in props; caldav 2.x has no etag property
+        etag = (getattr(event, "props", None) or {}).get(dav.GetEtag.tag)
+        if etag:
+            headers["If-Match"] = etag
+        response = self.client.put(str(event.url), ics_bytes, headers)
+        if response.status == 412:
+            raise PutError("Event changed on the server since it was read")
+        if response.status not in (200, 201, 204):
+            raise PutError(f"PUT {event.url} failed with HTTP {response.status}: {getattr(response, 'reason', '')}")
     
     def test_connection(self) -> Dict[str, str]:
-        """Test the CalDAV connection."""
+        """Test the CalDAV connection through the shared session.
+        
+        Other tool calls may be mid-request on that session, so it is only replaced
+        when the probe itself fails at the transport level.
+        """
         try:
             if not self.connect():
                 return {
                     "success": False,
                     "error": "Failed to establish connection"
                 }
-                
-            calendars = self.get_calendars()
+            try:
+                calendars = self.get_calendars()
+            except Exception as e:
+                if not isinstance(e, (ConnectionError, TimeoutError, *self._transport_errors())):
+                    raise
+                logger.warning("⚠️ CalDAV session probe failed, reconnecting: %s", e)
+                if not self.connect(force=True):
+                    return {
+                        "success": False,
+                        "error": "Failed to establish connection"
+                    }
+                calendars = self.get_calendars()
             return {
                 "success": True,
                 "email": self.email,
@@ -178,6 +755,7 @@ class CalDAVClient:
                 "server_url": ICAL_SERVER_URL
             }
         except Exception as e:
+            self.invalidate_on_error(e)
             return {
                 "success": False,
                 "error": str(e)
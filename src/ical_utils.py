@@ -3,210 +3,477 @@
 iCalendar Utilities Module
 Handles iCalendar parsing, creation, and manipulation.
 """
+from __future__ import annotations
+
 import logging
+import re
+import secrets
+from functools import lru_cache
 from datetime import datetime, date, timezone, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Optional
-from uuid import uuid4
+from typing import TYPE_CHECKING, List, Dict, Optional, Sequence, Tuple, Union
 
-import caldav
-from icalendar import Calendar as IcsCalendar, Event as IcsEvent, Alarm as IcsAlarm
+# icalendar and caldav are imported on first use to keep server cold-start cheap
+if TYPE_CHECKING:
+    import caldav
+    from icalendar import Calendar as IcsCalendar, Event as IcsEvent, Alarm as IcsAlarm
 
 logger = logging.getLogger(__name__)
 
+_ICS_PRODID = '-//iCloud CalDAV MCP//EN'
+
+# Content line of a VEVENT property we may need without a full parse, including folded continuations
+_ICS_FIELD_RE = re.compile(
+    rb'^(UID|SUMMARY|DTSTART|DTEND|LOCATION|DESCRIPTION)(?:;[^:\r\n]*)?:([^\r\n]*(?:\r?\n[ \t][^\r\n]*)*)',
+    re.M
+)
+_ICS_UNFOLD_RE = re.compile(rb'\r?\n[ \t]')
+
+_EVENT_UID_DOMAIN = 'icloud-caldav-mcp'
+
+
+def _new_uid() -> str:
+    """Return a globally unique iCalendar UID (128 bits from the OS CSPRNG)."""
+    return f"{secrets.token_hex(16)}@{_EVENT_UID_DOMAIN}"
+
+
+@lru_cache(maxsize=64)
+def _zi(tz: str) -> ZoneInfo:
+    """Return a cached ZoneInfo for an IANA zone name."""
+    return ZoneInfo(tz)
+
+
+def _parse_iso(v: str, tz: Optional[str]) -> datetime:
+    """Parse a stripped ISO string."""
+    dt = datetime.fromisoformat(v)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_zi(tz) if tz else timezone.utc)
+    return dt
+
+
+# Agents repeat the same boundaries (today, next week); results are immutable, so share them
+_parse_iso_cached = lru_cache(maxsize=1024)(_parse_iso)
+
 
 class ICalUtils:
     """Utilities for iCalendar operations."""
     
+    __slots__ = ()
+    
     @staticmethod
     def parse_iso_datetime(value: Optional[str], tz: Optional[str] = None) -> Optional[datetime]:
         """Parse ISO datetime string with optional timezone."""
         if value is None or value == "":
             return None
-        v = value.strip()
+        value = value.strip()
         try:
-            # Date-only input (YYYY-MM-DD)
-            if len(v) == 10 and v[4] == "-" and v[7] == "-":
-                d = date.fromisoformat(v)
-                if tz:
-                    return datetime(d.year, d.month, d.day, tzinfo=ZoneInfo(tz))
-                else:
-                    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
-            
-            # Replace trailing Z with +00:00 for fromisoformat compatibility
-            if v.endswith("Z"):
-                v = v[:-1] + "+00:00"
-            
-            dt = datetime.fromisoformat(v)
-            if dt.tzinfo is None:
-                if tz:
-                    dt = dt.replace(tzinfo=ZoneInfo(tz))
-                else:
-                    dt = dt.replace(tzinfo=timezone.utc)
-            return dt
+            # Sub-second timestamps are effectively unique, so they would only churn the cache
+            if '.' in value or ',' in value:
+                return _parse_iso(value, tz)
+            return _parse_iso_cached(value, tz)
         except Exception:
             raise ValueError(f"Invalid ISO datetime '{value}'. Use YYYY-MM-DD or RFC3339/ISO-8601 format.")
     
+    @staticmethod
+    def cache_stats() -> Dict[str, Dict[str, int]]:
+        """Report hit/miss counters for the module's parse and render caches."""
+        caches = {
+            "iso_datetime": _parse_iso_cached,
+            "alarm_fields": _parse_alarm_fields,
+            "calendar_templates": _calendar_template,
+            "valarm_templates": _valarm_head,
+        }
+        return {name: fn.cache_info()._asdict() for name, fn in caches.items()}
+    
+    @staticmethod
+    def new_event_uid() -> str:
+        """Generate a globally unique UID for a new event."""
+        return _new_uid()
+    
+    @staticmethod
+    def is_ymd(value: str) -> bool:
+        """Check for a bare YYYY-MM-DD date string without allocating."""
+        return (
+            len(value) == 10 and value[4] == '-' and value[7] == '-'
+            and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit()
+        )
+    
+    @staticmethod
+    def needs_vtimezone(*values: object) -> bool:
+        """Whether any value is a datetime whose zone must be written as a VTIMEZONE.
+        
+        Dates and UTC/fixed-offset datetimes serialize without a TZID.
+        """
+        for value in values:
+            tzinfo = getattr(value, 'tzinfo', None)
+            if tzinfo is not None and not isinstance(tzinfo, timezone):
+                return True
+        return False
+    
     @staticmethod
     def dt_to_iso(dt: Optional[object]) -> Optional[str]:
         """Convert datetime/date object to ISO string."""
         if dt is None:
             return None
-        # icalendar may give a date or datetime
-        if isinstance(dt, date) and not isinstance(dt, datetime):
-            return date(dt.year, dt.month, dt.day).isoformat()
+        # icalendar may give a date or datetime; exact type checks keep the common case cheap
+        t = type(dt)
+        if t is datetime:
+            # Naive values are treated as UTC; appending the offset avoids building a new datetime
+            return dt.isoformat() if dt.tzinfo is not None else dt.isoformat() + "+00:00"
+        if t is date:
+            return dt.isoformat()
+        # Subclasses (e.g. pandas/arrow types) take the general path
         if isinstance(dt, datetime):
             if dt.tzinfo is None:
                 dt = dt.replace(tzinfo=timezone.utc)
             return dt.isoformat()
+        if isinstance(dt, date):
+            return dt.isoformat()
         # Fallback string
         return str(dt)
     
     @staticmethod
     def get_event_ics_bytes(event_obj: caldav.Event) -> bytes:
         """Fetch ICS data for an event reliably and return as bytes."""
-        data = getattr(event_obj, 'data', None)
-        if data is None or data == b'' or data == '':
-            try:
-                event_obj.load()  # ensure ICS is fetched
-                data = getattr(event_obj, 'data', None)
-            except Exception:
-                pass
-        if isinstance(data, str):
-            if data.strip().lower() == 'none' or data.strip() == '':
-                try:
-                    event_obj.load()
-                    data = getattr(event_obj, 'data', None)
-                except Exception:
-                    pass
+        data = ICalUtils._coerce_ics_bytes(getattr(event_obj, 'data', None))
+        # Listings already carry calendar-data from the REPORT; only GET when it is missing
+        if b'BEGIN:VCALENDAR' in data:
+            return data
+        try:
+            event_obj.load()  # ensure ICS is fetched
+            data = ICalUtils._coerce_ics_bytes(getattr(event_obj, 'data', None))
+        except Exception:
+            pass
+        return data
+    
+    @staticmethod
+    def _coerce_ics_bytes(data: object) -> bytes:
+        """Normalize caldav's str/bytes/None event data to bytes."""
         if isinstance(data, bytes):
-            data_bytes = data
-        elif isinstance(data, str):
-            data_bytes = data.encode('utf-8', errors='ignore')
-        else:
-            data_bytes = str(data if data is not None else '').encode('utf-8', errors='ignore')
-        # Best-effort sanity check; ICS should contain VCALENDAR header
-        if b'BEGIN:VCALENDAR' not in data_bytes:
-            try:
-                event_obj.load()
-                fresh = getattr(event_obj, 'data', None)
-                if isinstance(fresh, bytes):
-                    data_bytes = fresh
-                elif isinstance(fresh, str):
-                    data_bytes = fresh.encode('utf-8', errors='ignore')
-            except Exception:
-                pass
-        return data_bytes
+            return data
+        if isinstance(data, bytearray):
+            return bytes(data)
+        if isinstance(data, str):
+            return data.encode('utf-8', errors='ignore')
+        return b''
+    
+    @staticmethod
+    def scan_ics_field(ics_bytes: bytes, field: bytes) -> Optional[bytes]:
+        """Pull one raw VEVENT property value out of ICS bytes without building components.
+        
+        Only the first VEVENT's own properties are scanned (not VTIMEZONE or VALARM),
+        folded lines are unfolded, and the value is returned unescaped as-is.
+        """
+        start = ics_bytes.find(b'BEGIN:VEVENT')
+        if start < 0:
+            return None
+        end = ics_bytes.find(b'END:VEVENT', start)
+        nested = ics_bytes.find(b'BEGIN:', start + 12)
+        if nested >= 0 and (end < 0 or nested < end):
+            end = nested
+        field = field.upper()
+        for m in _ICS_FIELD_RE.finditer(ics_bytes, start, end if end >= 0 else len(ics_bytes)):
+            if m.group(1) == field:
+                return _ICS_UNFOLD_RE.sub(b'', m.group(2))
+        return None
     
     @staticmethod
     def parse_event_from_ics(event_obj: caldav.Event) -> Dict[str, Optional[str]]:
         """Parse an event from CalDAV object to standardized dict format."""
+        # caldav's URL.__str__ re-joins the URL parts, so render it once for every branch below
+        url = getattr(event_obj, "url", None)
+        url_str = str(url) if url is not None else ""
         try:
-            ics_bytes = ICalUtils.get_event_ics_bytes(event_obj)
-            cal_ics = IcsCalendar.from_ical(ics_bytes)
-            
-            summary = None
-            dtstart_val = None
-            dtend_val = None
-            uid_val = None
-            description = None
-            location = None
-            
-            for comp in cal_ics.walk('vevent'):
-                if comp.get('summary') is not None and summary is None:
-                    summary = str(comp.get('summary'))
-                if comp.get('uid') is not None and uid_val is None:
-                    uid_val = str(comp.get('uid'))
-                if comp.get('dtstart') is not None and dtstart_val is None:
-                    dtstart_val = comp.get('dtstart').dt
-                if comp.get('dtend') is not None and dtend_val is None:
-                    dtend_val = comp.get('dtend').dt
-                if comp.get('description') is not None and description is None:
-                    description = str(comp.get('description'))
-                if comp.get('location') is not None and location is None:
-                    location = str(comp.get('location'))
-                    
-            return {
-                "url": str(getattr(event_obj, "url", "")),
-                "uid": uid_val,
-                "summary": summary,
-                "description": description,
-                "location": location,
-                "start": ICalUtils.dt_to_iso(dtstart_val),
-                "end": ICalUtils.dt_to_iso(dtend_val)
-            }
+            # caldav parses the payload once and keeps the result (already populated when
+            # recurrences were expanded client-side), so no to_ical() round-trip or re-parse
+            cal_ics = event_obj.icalendar_instance
+            if cal_ics is None:
+                event_obj.load()
+                cal_ics = event_obj.icalendar_instance
+            return {"url": url_str, **_event_fields_from_calendar(cal_ics)}
         except Exception as e:
-            logger.warning(f"Failed to parse event: {e}")
-            # Return minimal info on parse failure
+            logger.warning("Failed to parse event: %s", e)
+            # Return minimal info on parse failure, salvaging plain fields from the raw bytes
+            ics_bytes = ICalUtils._coerce_ics_bytes(getattr(event_obj, 'data', None))
+            
+            def scanned(field: bytes) -> Optional[str]:
+                value = ICalUtils.scan_ics_field(ics_bytes, field)
+                return value.decode('utf-8', errors='replace') if value is not None else None
             return {
-                "url": str(getattr(event_obj, "url", "")),
-                "uid": None,
-                "summary": None,
+                "url": url_str,
+                "uid": scanned(b'UID'),
+                "summary": scanned(b'SUMMARY'),
                 "description": None,
                 "location": None,
                 "start": None,
                 "end": None
             }
     
+    @staticmethod
+    def parse_alarms_from_ics(ics_bytes: bytes) -> List[Dict[str, object]]:
+        """List an event's VALARMs with trigger normalized to minutes_before."""
+        return [dict(alarm) for alarm in _parse_alarm_fields(ics_bytes)]
+    
     @staticmethod
     def create_ics_calendar() -> IcsCalendar:
         """Create a new iCalendar object with standard headers."""
+        from icalendar import Calendar as IcsCalendar
+        
         ics_cal = IcsCalendar()
-        ics_cal.add('prodid', '-//iCloud CalDAV MCP//EN')
-        ics_cal.add('version', '2.0')
+        # Plain item assignment reuses the pre-encoded values and skips add()'s encoding
+        for name, value in _calendar_header():
+            ics_cal[name] = value
         return ics_cal
     
     @staticmethod
     def create_alarm(minutes_before: int, description: str = 'Reminder', action: str = 'DISPLAY', related: str = 'START') -> IcsAlarm:
         """Create a VALARM component using the exact same pattern that worked in server_old.py."""
+        from icalendar import Alarm as IcsAlarm
+        
         alarm = IcsAlarm()
         alarm.ACTION = action or 'DISPLAY'
         if description:
             alarm.DESCRIPTION = description
         alarm.TRIGGER = timedelta(minutes=-int(minutes_before))
         alarm.TRIGGER_RELATED = related or 'START'
-        alarm.uid = str(uuid4())
+        alarm.uid = _new_uid()
         alarm.add('X-WR-ALARMUID', alarm.uid, encode=False)
         return alarm
     
+    @staticmethod
+    def render_event_ics(
+        uid: str,
+        summary: str,
+        dtstart: Union[date, datetime],
+        dtend: Union[date, datetime],
+        dtstamp: datetime,
+        description: Optional[str] = None,
+        location: Optional[str] = None,
+        rrule: Optional[str] = None,
+        alarms: Sequence[AlarmSpec] = ()
+    ) -> str:
+        """Serialize a single-VEVENT calendar to ICS text.
+        
+        The fixed schema we emit is written straight from a template behind a
+        per-zone cached VCALENDAR/VTIMEZONE prologue; anything the template cannot
+        express (non-IANA tzinfo, mixed zones) goes through icalendar.
+        """
+        text = ICalUtils._render_event_ics_template(
+            uid, summary, dtstart, dtend, dtstamp, description, location, rrule, alarms
+        )
+        if text is not None:
+            return text
+        return ICalUtils._build_event_ics(
+            uid, summary, dtstart, dtend, dtstamp, description, location, rrule, alarms
+        )
+    
+    @staticmethod
+    def _render_event_ics_template(
+        uid: str,
+        summary: str,
+        dtstart: Union[date, datetime],
+        dtend: Union[date, datetime],
+        dtstamp: datetime,
+        description: Optional[str],
+        location: Optional[str],
+        rrule: Optional[str],
+        alarms: Sequence[AlarmSpec]
+    ) -> Optional[str]:
+        """Render ICS text without icalendar, or None if the times need an unsupported VTIMEZONE."""
+        recurring = bool(rrule)
+        start = _ics_date_value(dtstart, recurring)
+        end = _ics_date_value(dtend, recurring)
+        if start is None or end is None:
+            return None
+        start_value, start_tzid = start
+        end_value, end_tzid = end
+        tzid = start_tzid or end_tzid
+        if end_tzid and end_tzid != tzid:
+            return None
+        template = _calendar_template(tzid)
+        if template is None:
+            return None
+        prologue, epilogue = template
+        
+        lines = [
+            "BEGIN:VEVENT",
+            f"SUMMARY:{_ics_escape_text(summary)}",
+            f"DTSTART{start_value}",
+            f"DTEND{end_value}",
+            f"DTSTAMP:{_ics_utc_stamp(dtstamp)}",
+            f"UID:{_ics_escape_text(uid)}",
+        ]
+        if rrule:
+            lines.append(f"RRULE:{_ics_rrule_value(rrule)}")
+        if description:
+            lines.append(f"DESCRIPTION:{_ics_escape_text(description)}")
+        if location:
+            lines.append(f"LOCATION:{_ics_escape_text(location)}")
+        parts = [prologue]
+        parts.extend(_fold_ics_line(line) + "\r\n" for line in lines)
+        for minutes_before, alarm_description, action, related in alarms:
+            alarm_uid = _new_uid()
+            parts.append(_valarm_head(int(minutes_before), alarm_description or '', action or 'DISPLAY', related or 'START'))
+            parts.append(f"UID:{alarm_uid}\r\nX-WR-ALARMUID:{alarm_uid}\r\nEND:VALARM\r\n")
+        parts.append("END:VEVENT\r\n")
+        parts.append(epilogue)
+        return "".join(parts)
+    
+    @staticmethod
+    def _build_event_ics(
+        uid: str,
+        summary: str,
+        dtstart: Union[date, datetime],
+        dtend: Union[date, datetime],
+        dtstamp: datetime,
+        description: Optional[str],
+        location: Optional[str],
+        rrule: Optional[str],
+        alarms: Sequence[AlarmSpec]
+    ) -> str:
+        """Build ICS text with icalendar, including any VTIMEZONE definitions."""
+        from icalendar import Event as IcsEvent
+        
+        ics_cal = ICalUtils.create_ics_calendar()
+        evt = IcsEvent()
+        evt.add('uid', uid)
+        evt.add('summary', summary)
+        evt.add('dtstamp', dtstamp)
+        if description:
+            evt.add('description', description)
+        if location:
+            evt.add('location', location)
+        evt.add('dtstart', dtstart)
+        evt.add('dtend', dtend)
+        if rrule:
+            evt.add('rrule', rrule)
+        for minutes_before, alarm_description, action, related in alarms:
+            evt.add_component(ICalUtils.create_alarm(minutes_before, alarm_description, action, related))
+        ics_cal.add_component(evt)
+        
+        # Add timezones
+        if ICalUtils.needs_vtimezone(dtstart, dtend):
+            try:
+                ics_cal.add_missing_timezones()
+            except Exception:
+                pass
+        
+        return ics_cal.to_ical().decode('utf-8')
+    
     @staticmethod
     def copy_event_properties(original_event: IcsEvent, new_event: IcsEvent) -> None:
         """Copy standard properties from original event to new event."""
+        # Each property is looked up once and the value reused
+        get = original_event.get
+        
         # Copy existing UID
-        if original_event.get('uid'):
-            new_event.add('uid', str(original_event.get('uid')))
+        uid_value = get('uid')
+        if uid_value:
+            new_event.add('uid', str(uid_value))
         else:
-            new_event.add('uid', f"{uuid4()}@icloud-caldav-mcp")
+            new_event.add('uid', ICalUtils.new_event_uid())
         
         # Copy existing DTSTAMP or create new one
-        if original_event.get('dtstamp'):
-            new_event.add('dtstamp', original_event.get('dtstamp').dt)
+        dtstamp_value = get('dtstamp')
+        if dtstamp_value:
+            new_event.add('dtstamp', dtstamp_value.dt)
         else:
             new_event.add('dtstamp', datetime.now(timezone.utc))
         
         # Copy dates
-        if original_event.get('dtstart'):
-            new_event.add('dtstart', original_event.get('dtstart').dt)
-        if original_event.get('dtend'):
-            new_event.add('dtend', original_event.get('dtend').dt)
+        dtstart_value = get('dtstart')
+        if dtstart_value:
+            new_event.add('dtstart', dtstart_value.dt)
+        dtend_value = get('dtend')
+        if dtend_value:
+            new_event.add('dtend', dtend_value.dt)
             
         # Copy other properties
-        if original_event.get('rrule'):
-            new_event.add('rrule', str(original_event.get('rrule')))
-        if original_event.get('summary'):
-            new_event.add('summary', str(original_event.get('summary')))
-        if original_event.get('description'):
-            desc_value = original_event.get('description')
-            if hasattr(desc_value, 'to_ical'):
-                new_event.add('description', desc_value.to_ical().decode('utf-8'))
-            else:
-                new_event.add('description', str(desc_value))
-        if original_event.get('location'):
-            loc_value = original_event.get('location')
-            if hasattr(loc_value, 'to_ical'):
-                new_event.add('location', loc_value.to_ical().decode('utf-8'))
-            else:
-                new_event.add('location', str(loc_value))
+        rrule_value = get('rrule')
+        if rrule_value:
+            new_event.add('rrule', str(rrule_value))
+        summary_value = get('summary')
+        if summary_value:
+            new_event.add('summary', str(summary_value))
+        for name in ('description', 'location'):
+            value = get(name)
+            if value:
+                # Pass the vText through: re-adding its to_ical() form would escape ',;\\' twice
+                new_event.add(name, value)
+    
+    @staticmethod
+    def patch_event_text(ics_bytes: bytes, fields: Dict[str, str]) -> Optional[bytes]:
+        """Rewrite TEXT properties of the first VEVENT and bump its SEQUENCE without a full parse.
+        
+        ``fields`` maps property names (SUMMARY, LOCATION, DESCRIPTION) to new
+        values; missing properties are added ahead of any nested VALARM. Returns
+        None when there is no complete VEVENT or SEQUENCE is not an integer (or
+        follows a VALARM), so the caller can fall back to icalendar.
+        """
+        pending = {name.upper().encode('ascii'): value for name, value in fields.items()}
+        targets = set(pending)
+        lines = ics_bytes.splitlines(keepends=True)
+        out: List[bytes] = []
+        state = 0  # 0: before the first VEVENT, 1: inside it, 2: past it
+        depth = 0
+        sequence_seen = False
+        flushed = False
+        
+        def flush() -> None:
+            # New properties must precede the event's nested VALARMs (RFC 5545 eventc)
+            for prop, value in pending.items():
+                out.append(_ics_text_line(prop, value))
+            pending.clear()
+            if not sequence_seen:
+                out.append(b'SEQUENCE:1\r\n')
+        
+        i = 0
+        while i < len(lines):
+            # Gather a logical line with its folded continuations
+            j = i + 1
+            while j < len(lines) and lines[j][:1] in (b' ', b'\t'):
+                j += 1
+            logical = lines[i:j]
+            i = j
+            if state != 1:
+                out.extend(logical)
+                if state == 0 and logical[0].rstrip().upper() == b'BEGIN:VEVENT':
+                    state = 1
+                continue
+            
+            name = logical[0].split(b':', 1)[0].split(b';', 1)[0].strip().upper()
+            if name == b'BEGIN':
+                if not depth and not flushed:
+                    flush()
+                    flushed = True
+                depth += 1
+            elif name == b'END' and depth:
+                depth -= 1
+            elif name == b'END':
+                if not flushed:
+                    flush()
+                out.extend(logical)
+                state = 2
+                continue
+            elif depth == 0 and name in targets:
+                value = pending.pop(name, None)
+                # Duplicate occurrences of a replaced property are dropped
+                if value is not None:
+                    out.append(_ics_text_line(name, value))
+                continue
+            elif depth == 0 and name == b'SEQUENCE':
+                if flushed:
+                    # SEQUENCE after a VALARM: leave the out-of-order layout to icalendar
+                    return None
+                try:
+                    current = int(b''.join(line.rstrip(b'\r\n').lstrip(b' \t') for line in logical).split(b':', 1)[1])
+                except (IndexError, ValueError):
+                    return None
+                sequence_seen = True
+                out.append(b'SEQUENCE:%d\r\n' % (current + 1))
+                continue
+            out.extend(logical)
+        return b''.join(out) if state == 2 else None
     
     @staticmethod
     def get_sequence_number(original_event: Optional[IcsEvent]) -> int:
@@ -219,3 +486,331 @@ class ICalUtils:
             return current_sequence + 1
         except Exception:
             return 1
+
+
+@lru_cache(maxsize=1)
+def _calendar_header() -> tuple:
+    """Encode the standard VCALENDAR header properties once."""
+    from icalendar import Calendar as IcsCalendar
+    
+    proto = IcsCalendar()
+    proto.add('prodid', _ICS_PRODID)
+    proto.add('version', '2.0')
+    return tuple(proto.items())
+
+
+@lru_cache(maxsize=64)
+def _calendar_template(tz_name: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Serialize the VCALENDAR prologue (with the zone's VTIMEZONE) and epilogue once per zone."""
+    prologue = f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{_ICS_PRODID}\r\n"
+    epilogue = "END:VCALENDAR\r\n"
+    if not tz_name:
+        return prologue, epilogue
+    
+    from icalendar import Calendar as IcsCalendar, Event as IcsEvent
+    
+    # Let icalendar derive the VTIMEZONE from a throwaway event; the default
+    # transition range does not depend on the event, so the result is reusable
+    try:
+        probe = IcsCalendar()
+        evt = IcsEvent()
+        evt.add('dtstart', datetime(2000, 1, 1, tzinfo=_zi(tz_name)))
+        probe.add_component(evt)
+        probe.add_missing_timezones()
+        vtimezones = b"".join(tz.to_ical() for tz in probe.walk('VTIMEZONE'))
+    except Exception:
+        return None
+    if not vtimezones:
+        return None
+    return prologue + vtimezones.decode('utf-8'), epilogue
+
+
+# RFC 5545 TEXT escaping; translate() maps each character once, so escapes are never re-escaped
+_ICS_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n'})
+
+# (minutes_before, description, action, related)
+AlarmSpec = Tuple[int, str, str, str]
+
+
+def _ics_escape_text(value: str) -> str:
+    """Escape a TEXT property value per RFC 5545."""
+    return value.replace('\r\n', '\n').replace('\r', '\n').translate(_ICS_TEXT_ESCAPES)
+
+
+def _ics_text_line(name: bytes, value: str) -> bytes:
+    """Render a folded TEXT content line with its CRLF."""
+    return (_fold_ics_line(f"{name.decode('ascii')}:{_ics_escape_text(value)}") + "\r\n").encode('utf-8')
+
+
+def _fold_ics_line(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 sequences."""
+    if len(line) <= 75 and line.isascii():
+        return line
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    start = 0
+    limit = 75
+    while len(data) - start > limit:
+        end = start + limit
+        # Back off so the next chunk does not begin with a UTF-8 continuation byte
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start = end
+        limit = 74  # continuation lines start with a space
+    parts.append(data[start:])
+    return b'\r\n '.join(parts).decode('utf-8')
+
+
+def _ics_rrule_value(rrule: str) -> str:
+    """Validate an RRULE and re-serialize it, so no raw caller text reaches the template.
+    
+    Raises ValueError on malformed rules (including embedded line breaks).
+    """
+    from icalendar import vRecur
+    
+    rule = rrule.strip()
+    if rule[:6].upper() == "RRULE:":
+        rule = rule[6:]
+    if "\r" in rule or "\n" in rule:
+        raise ValueError(f"Invalid RRULE '{rrule}': line breaks are not allowed")
+    try:
+        parsed = vRecur.from_ical(rule)
+    except Exception as e:
+        raise ValueError(f"Invalid RRULE '{rrule}': {e}") from e
+    if "FREQ" not in parsed:
+        raise ValueError(f"Invalid RRULE '{rrule}': FREQ is required")
+    return vRecur(parsed).to_ical().decode('utf-8')
+
+
+def _ics_utc_stamp(value: datetime) -> str:
+    """Render a DATE-TIME in UTC form (YYYYMMDDTHHMMSSZ)."""
+    if value.tzinfo is not timezone.utc:
+        value = value.astimezone(timezone.utc)
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ics_date_value(value: Union[date, datetime], recurring: bool) -> Optional[Tuple[str, Optional[str]]]:
+    """Render DTSTART/DTEND parameters+value and the TZID it references, or None if unsupported."""
+    if not isinstance(value, datetime):
+        return f";VALUE=DATE:{value.strftime('%Y%m%d')}", None
+    tzinfo = value.tzinfo
+    key = getattr(tzinfo, 'key', None)
+    if tzinfo is None or tzinfo is timezone.utc or key in ('UTC', 'Etc/UTC'):
+        return f":{value.strftime('%Y%m%dT%H%M%S')}Z", None
+    # A fixed offset maps exactly onto UTC unless a recurrence has to follow local wall time
+    if isinstance(tzinfo, timezone) and not recurring:
+        return f":{_ics_utc_stamp(value)}", None
+    # Named zones keep local wall time and reference the cached VTIMEZONE
+    if isinstance(tzinfo, ZoneInfo) and key:
+        return f";TZID={key}:{value.strftime('%Y%m%dT%H%M%S')}", key
+    return None
+
+
+@lru_cache(maxsize=128)
+def _valarm_head(minutes_before: int, description: str, action: str, related: str) -> str:
+    """Render the folded VALARM lines up to its UID; agents reuse a handful of reminder shapes."""
+    related_param = 'END' if related.upper() == 'END' else 'START'
+    lines = ["BEGIN:VALARM", f"ACTION:{_ics_escape_text(action)}"]
+    if description:
+        lines.append(f"DESCRIPTION:{_ics_escape_text(description)}")
+    lines.append(f"TRIGGER;RELATED={related_param}:{_ics_duration(timedelta(minutes=-minutes_before))}")
+    return "".join(_fold_ics_line(line) + "\r\n" for line in lines)
+
+
+def _ics_duration(delta: timedelta) -> str:
+    """Render a timedelta as an RFC 5545 DURATION value."""
+    total = int(delta.total_seconds())
+    sign = '-' if total < 0 else ''
+    days, rem = divmod(abs(total), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, seconds = divmod(rem, 60)
+    out = f"{sign}P"
+    if days:
+        out += f"{days}D"
+    if hours or minutes or seconds or not days:
+        out += "T"
+        if hours:
+            out += f"{hours}H"
+        if minutes:
+            out += f"{minutes}M"
+        if seconds or not (hours or minutes):
+            out += f"{seconds}S"
+    return out
+
+
+# VEVENT property names (as stored by icalendar) -> listing field
+_EVENT_FIELD_KEYS = {
+    'SUMMARY': 'summary',
+    'UID': 'uid',
+    'DTSTART': 'dtstart',
+    'DTEND': 'dtend',
+    'DESCRIPTION': 'description',
+    'LOCATION': 'location',
+}
+
+
+def _event_fields_from_calendar(cal_ics: IcsCalendar) -> Dict[str, Optional[str]]:
+    """Extract the listing fields from an already-parsed VCALENDAR."""
+    fields = {}
+    # VEVENTs are direct children of VCALENDAR; iterating them lazily avoids walk()'s recursive
+    # list of every component (large for expanded recurrences) when the first event suffices
+    for comp in cal_ics.subcomponents:
+        if comp.name != 'VEVENT':
+            continue
+        # One pass over the component's own properties instead of a caseless get() per field
+        for name, value in comp.items():
+            key = _EVENT_FIELD_KEYS.get(name)
+            if key is not None and key not in fields and value is not None:
+                fields[key] = value
+        if len(fields) == len(_EVENT_FIELD_KEYS):
+            break
+    
+    summary = str(fields['summary']) if 'summary' in fields else None
+    uid_val = str(fields['uid']) if 'uid' in fields else None
+    description = str(fields['description']) if 'description' in fields else None
+    location = str(fields['location']) if 'location' in fields else None
+    dtstart_val = fields['dtstart'].dt if 'dtstart' in fields else None
+    dtend_val = fields['dtend'].dt if 'dtend' in fields else None
+    
+    return {
+        "uid": uid_val,
+        "summary": summary,
+        "description": description,
+        "location": location,
+        "start": ICalUtils.dt_to_iso(dtstart_val),
+        "end": ICalUtils.dt_to_iso(dtend_val)
+    }
+
+
+# Content line: NAME[;PARAM=...]:VALUE
+_ICS_LINE_RE = re.compile(rb'^([A-Za-z0-9-]+)((?:;[^:]*)?):(.*)$')
+_ICS_DURATION_RE = re.compile(
+    r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$'
+)
+_ICS_TEXT_UNESCAPE_RE = re.compile(r'\\([\\;,nN])')
+
+
+def _ics_unescape_text(value: str) -> str:
+    """Undo RFC 5545 TEXT escaping."""
+    return _ICS_TEXT_UNESCAPE_RE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+
+def _parse_ics_duration(value: str) -> timedelta:
+    """Parse an RFC 5545 DURATION value such as -PT15M or P1DT2H."""
+    m = _ICS_DURATION_RE.match(value.strip())
+    if m is None or value.strip().rstrip('T').endswith('P'):
+        raise ValueError(f"Invalid duration '{value}'")
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0)
+    )
+    return -delta if sign == '-' else delta
+
+
+# Parsed-payload cache; sized for agents re-polling a few weeks across several calendars
+_PARSE_CACHE_SIZE = 4096
+
+
+def _iter_valarm_blocks(ics_bytes: bytes):
+    """Yield the unfolded content lines of each VALARM block."""
+    block = None
+    for line in _ICS_UNFOLD_RE.sub(b'', ics_bytes).splitlines():
+        # Component names are case-insensitive (RFC 5545 §2)
+        upper = line.rstrip().upper()
+        if block is None:
+            if upper == b'BEGIN:VALARM':
+                block = []
+        elif upper == b'END:VALARM':
+            yield block
+            block = None
+        else:
+            block.append(line)
+
+
+def _scan_alarm_fields(ics_bytes: bytes) -> Tuple[Dict[str, object], ...]:
+    """Line-scan VALARM fields without building an icalendar component tree."""
+    if b'BEGIN:VCALENDAR' not in ics_bytes:
+        raise ValueError("Not an iCalendar payload")
+    alarms = []
+    for block in _iter_valarm_blocks(ics_bytes):
+        props: Dict[str, Tuple[str, str]] = {}
+        for line in block:
+            m = _ICS_LINE_RE.match(line)
+            if m is None:
+                raise ValueError(f"Malformed content line {line!r}")
+            if b'"' in m.group(2):
+                # A quoted parameter may contain ':', which the line pattern would split on
+                raise ValueError("Quoted parameter values")
+            name = m.group(1).decode('ascii').upper()
+            if name not in props:
+                props[name] = (m.group(2).decode('utf-8').upper(), m.group(3).decode('utf-8'))
+        
+        minutes_before = None
+        related = None
+        if 'TRIGGER' in props:
+            params, value = props['TRIGGER']
+            related = 'START'
+            for param in params.split(';'):
+                if param.startswith('RELATED='):
+                    related = param[8:].strip('"')
+            if 'VALUE=DATE-TIME' not in params:
+                minutes_before = int(abs(_parse_ics_duration(value).total_seconds()) // 60)
+        
+        def text(name: str) -> Optional[str]:
+            return _ics_unescape_text(props[name][1]) if name in props else None
+        
+        alarms.append({
+            "uid": text('UID'),
+            "x_wr_alarmuid": text('X-WR-ALARMUID'),
+            "minutes_before": minutes_before,
+            "related": related,
+            "action": text('ACTION'),
+            "description": text('DESCRIPTION')
+        })
+    return tuple(alarms)
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_alarm_fields(ics_bytes: bytes) -> Tuple[Dict[str, object], ...]:
+    """Extract VALARM fields from raw ICS bytes; keyed on the payload, so unchanged events parse once."""
+    try:
+        return _scan_alarm_fields(ics_bytes)
+    except Exception:
+        # Anything the line scanner can't handle goes through the full parser
+        return _parse_alarm_fields_icalendar(ics_bytes)
+
+
+def _parse_alarm_fields_icalendar(ics_bytes: bytes) -> Tuple[Dict[str, object], ...]:
+    """Extract VALARM fields by fully parsing the calendar with icalendar."""
+    from icalendar import Calendar as IcsCalendar
+    
+    cal_ics = IcsCalendar.from_ical(ics_bytes)
+    
+    alarms = []
+    for comp in cal_ics.walk('valarm'):
+        trigger_prop = comp.get('trigger')
+        minutes_before = None
+        related = None
+        if trigger_prop is not None:
+            try:
+                value = getattr(trigger_prop, 'dt', trigger_prop)
+                rel_params = getattr(trigger_prop, 'params', {})
+                related = str(rel_params.get('RELATED', 'START')) if rel_params is not None else 'START'
+                if isinstance(value, timedelta):
+                    minutes_before = int(abs(value.total_seconds()) // 60)
+            except Exception:
+                pass
+        
+        alarms.append({
+            "uid": str(comp.get('uid')) if comp.get('uid') is not None else None,
+            "x_wr_alarmuid": str(comp.get('X-WR-ALARMUID')) if comp.get('X-WR-ALARMUID') is not None else None,
+            "minutes_before": minutes_before,
+            "related": related,
+            "action": str(comp.get('action')) if comp.get('action') is not None else None,
+            "description": str(comp.get('description')) if comp.get('description') is not None else None
+        })
+    return tuple(alarms)
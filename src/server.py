@@ -5,17 +5,30 @@ A FastMCP server that provides calendar operations for iCloud using CalDAV.
 """
 import os
 import json
+import asyncio
+import atexit
+import contextvars
+import functools
+import heapq
 import logging
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timezone, timedelta
 from typing import List, Dict, Optional
-from uuid import uuid4
 
 from fastmcp import FastMCP
-from icalendar import Calendar as IcsCalendar, Event as IcsEvent
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from caldav_client import CalDAVClient
-from ical_utils import ICalUtils
+from ical_utils import AlarmSpec, ICalUtils
+
+# orjson is an optional speedup for decoding tool arguments
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 # Configure logging
 logging.basicConfig(
@@ -30,8 +43,160 @@ mcp = FastMCP("iCloud CalDAV MCP Server")
 
 # Initialize CalDAV client
 caldav_client = CalDAVClient()
+# Close the pooled CalDAV connections cleanly on shutdown
+atexit.register(caldav_client.reset)
 ical_utils = ICalUtils()
 
+# Stateful sessions let clients negotiate capabilities once; serverless hosts can opt back out
+STATELESS_HTTP = os.environ.get("MCP_STATELESS_HTTP", "false").strip().lower() in ("1", "true", "yes")
+
+PYTHON_VERSION = sys.version.split(maxsplit=1)[0]
+
+# Default list_my_events window around now
+DEFAULT_LOOKBACK = timedelta(days=7)
+DEFAULT_LOOKAHEAD = timedelta(days=30)
+
+# Column order for list_my_events(output_format="columns")
+EVENT_COLUMNS = ("uid", "summary", "start", "end", "location", "description", "calendar_name", "url")
+
+# Startup credential check: "sync" blocks boot, "background" runs it in a thread, "off" skips it.
+# By default it runs in the background so mcp.run() starts serving without waiting on iCloud;
+# the session it opens is reused by the first tool call. Serverless cold starts skip it.
+STARTUP_HEALTHCHECK = os.environ.get(
+    "STARTUP_HEALTHCHECK",
+    "off" if os.environ.get("ENVIRONMENT") == "serverless" else "background"
+).strip().lower()
+
+# Outcome of the startup check, reported by get_startup_health
+startup_health: Dict[str, object] = {"status": "not_run", "mode": STARTUP_HEALTHCHECK}
+
+# Upper bound on concurrent per-calendar CalDAV requests
+MAX_CALENDAR_WORKERS = 8
+# Upper bound on concurrent DELETEs issued by delete_my_events
+MAX_DELETE_WORKERS = 8
+
+
+# Dedicated pool for blocking tool calls; asyncio's default pool is min(32, cpus + 4)
+# threads, which caps concurrent CalDAV requests at 5 on a single-vCPU container
+MAX_TOOL_WORKERS = int(os.environ.get("MCP_TOOL_WORKERS", "32"))
+_tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="caldav-tool")
+
+
+def run_in_thread(fn):
+    """Expose a blocking tool as a coroutine so its CalDAV I/O runs off the event loop."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await loop.run_in_executor(_tool_executor, call)
+    return wrapper
+
+
+def _parse_alarm_configs(alarm_configs: str) -> List[AlarmSpec]:
+    """Turn the alarm_configs JSON list into alarm specs; malformed input yields no alarms."""
+    try:
+        parsed = _json_loads(alarm_configs)
+        if not isinstance(parsed, list):
+            return []
+        return [
+            (
+                int(cfg.get('minutes_before', 15)),
+                cfg.get('description', 'Reminder'),
+                cfg.get('action', 'DISPLAY'),
+                cfg.get('related', 'START')
+            )
+            for cfg in parsed
+        ]
+    except Exception:
+        # If JSON parsing fails, ignore alarm_configs
+        return []
+
+
+def _event_sort_key(event: Dict[str, Optional[str]]) -> tuple:
+    """Order events by start time, then summary."""
+    return event.get("start") or "", event.get("summary") or ""
+
+
+def _parse_event_dates(start: str, end: str, all_day: bool, tz: Optional[str]) -> tuple:
+    """Parse event bounds once: a date pair for all-day events, else a tz-aware datetime pair.
+    
+    Raises ValueError with a user-facing message on malformed input.
+    """
+    if all_day:
+        if not (ical_utils.is_ymd(start) and ical_utils.is_ymd(end)):
+            raise ValueError("For all_day events, start and end must be YYYY-MM-DD.")
+        return date.fromisoformat(start), date.fromisoformat(end)
+    
+    start_dt = ical_utils.parse_iso_datetime(start, tz)
+    end_dt = ical_utils.parse_iso_datetime(end, tz)
+    if start_dt is None or end_dt is None:
+        raise ValueError("Start and end must be valid ISO-8601 datetimes.")
+    # parse_iso_datetime already attaches tz (or UTC) to naive input
+    return start_dt, end_dt
+
+
+def _delete_event(event_url: str) -> None:
+    """Issue a DELETE for one event URL on the shared session."""
+    import caldav
+    
+    caldav.Event(client=caldav_client.client, url=event_url).delete()
+
+
+def _apply_event_update(
+    ics_bytes: bytes,
+    summary: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    description: Optional[str],
+    location: Optional[str],
+    rrule: Optional[str],
+    timezone_name: Optional[str]
+):
+    """Parse an event and edit its first VEVENT in place; None if it cannot be parsed.
+    
+    Fields passed as None are left untouched. Raises ValueError on malformed start/end.
+    """
+    from icalendar import Calendar as IcsCalendar
+    
+    try:
+        original_cal = IcsCalendar.from_ical(ics_bytes)
+        # VEVENTs are direct children of VCALENDAR, so take the first without walk()'s full recursion
+        original_event = next((c for c in original_cal.subcomponents if c.name == 'VEVENT'), None)
+    except Exception:
+        original_event = None
+    if original_event is None:
+        return None
+    
+    def replace(name: str, value: object) -> None:
+        original_event.pop(name, None)
+        original_event.add(name, value)
+    
+    new_start = ical_utils.parse_iso_datetime(start, timezone_name) if start is not None else None
+    new_end = ical_utils.parse_iso_datetime(end, timezone_name) if end is not None else None
+    if new_start:
+        replace('dtstart', new_start)
+    if new_end:
+        replace('dtend', new_end)
+    if summary is not None:
+        replace('summary', summary)
+    if description is not None:
+        replace('description', description)
+    if location is not None:
+        replace('location', location)
+    if rrule is not None:
+        replace('rrule', rrule)
+    
+    # Increment sequence number
+    replace('sequence', ical_utils.get_sequence_number(original_event))
+    
+    # Existing VTIMEZONEs stay in place; only a new start/end in a named zone may need one
+    if ical_utils.needs_vtimezone(new_start, new_end):
+        try:
+            original_cal.add_missing_timezones()
+        except Exception:
+            pass
+    return original_cal
+
 
 # =============================================================================
 # MCP TOOLS
@@ -44,10 +209,45 @@ ical_utils = ICalUtils()
 ))
 def greet(name: str) -> str:
     """Simple greeting function for testing MCP connectivity."""
-    logger.info(f"🔧 TOOL CALL: greet(name='{name}')")
+    logger.info("🔧 TOOL CALL: greet(name='%s')", name)
     return f"Hello, {name}! Welcome to the iCloud CalDAV MCP server."
 
 
+# Everything in get_server_info except live stats is fixed for the process lifetime
+SERVER_INFO = {
+    "server_name": "iCloud CalDAV MCP Server",
+    "version": "1.0.0",
+    "environment": os.environ.get("ENVIRONMENT", "development"),
+    "python_version": PYTHON_VERSION,
+    "http_request_format": {
+        "method": "POST",
+        "endpoint": "/mcp",
+        "required_headers": {
+            "Content-Type": "application/json",
+            "Accept": "application/json, text/event-stream"
+        },
+        "json_body_format": {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {
+                "name": "tool_name_here",
+                "arguments": {
+                    "param1": "value1",
+                    "param2": "value2"
+                }
+            }
+        },
+        "response_format": "Server-Sent Events (text/event-stream) with 'data: ' prefix",
+        "session_management": (
+            "Stateless: every request is self-contained." if STATELESS_HTTP else
+            "Send 'initialize' once, keep the Mcp-Session-Id response header, "
+            "and include it on every following POST to reuse the session."
+        )
+    }
+}
+
+
 @mcp.tool(description=(
     "Get information about the MCP server including name, version, environment, Python version, and HTTP request format guidance. "
     "📡 IMPORTANT: This server requires specific HTTP headers and JSON-RPC format for all tool calls!"
@@ -55,83 +255,53 @@ def greet(name: str) -> str:
 def get_server_info() -> dict:
     """Returns basic information about the MCP server for debugging/monitoring."""
     return {
-        "server_name": "iCloud CalDAV MCP Server",
-        "version": "1.0.0",
-        "environment": os.environ.get("ENVIRONMENT", "development"),
-        "python_version": os.sys.version.split()[0],
-        "http_request_format": {
-            "method": "POST",
-            "endpoint": "/mcp",
-            "required_headers": {
-                "Content-Type": "application/json",
-                "Accept": "application/json, text/event-stream"
-            },
-            "json_body_format": {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "tools/call",
-                "params": {
-                    "name": "tool_name_here",
-                    "arguments": {
-                        "param1": "value1",
-                        "param2": "value2"
-                    }
-                }
-            },
-            "response_format": "Server-Sent Events (text/event-stream) with 'data: ' prefix"
+        **SERVER_INFO,
+        "stats": {
+            "caches": ical_utils.cache_stats()
         }
     }
 
 
 @mcp.tool(description="Test the connection status to iCloud CalDAV using environment variables.")
+@run_in_thread
 def get_connection_status() -> Dict[str, object]:
     """Test the iCloud CalDAV connection."""
     logger.info("🔧 TOOL CALL: get_connection_status()")
-    try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
-        
-        calendars = caldav_client.get_calendars()
-        result = {
-            "success": True,
-            "status": "connected",
-            "email": caldav_client.email,
-            "calendars_found": len(calendars),
-            "server_url": "https://caldav.icloud.com"
-        }
-        logger.info(f"✅ get_connection_status result: {result}")
+    # Probes the shared session rather than forcing a new one under concurrent tool calls
+    result = caldav_client.test_connection()
+    if not result["success"]:
+        logger.error("❌ get_connection_status failed: %s", result["error"])
         return result
-    except Exception as e:
-        logger.error(f"❌ get_connection_status failed: {type(e).__name__}: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = {"success": True, "status": "connected", **result}
+    logger.info("✅ get_connection_status result: %s", result)
+    return result
+
+
+@mcp.tool(description="Report the result of the server's startup connection check without contacting iCloud.")
+def get_startup_health() -> Dict[str, object]:
+    """Return the recorded startup connection check."""
+    logger.info("🔧 TOOL CALL: get_startup_health()")
+    return dict(startup_health)
 
 
 @mcp.tool(description="List your iCloud calendars.")
+@run_in_thread
 def list_my_calendars() -> Dict[str, object]:
     """List calendars."""
     logger.info("🔧 TOOL CALL: list_my_calendars()")
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        caldav_client.ensure_connected()
         
         calendars = caldav_client.get_calendars()
-        logger.info(f"✅ list_my_calendars found {len(calendars)} calendars")
+        logger.info("✅ list_my_calendars found %d calendars", len(calendars))
         return {
             "success": True,
             "calendars": calendars,
             "count": len(calendars)
         }
     except Exception as e:
-        logger.error(f"❌ list_my_calendars failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ list_my_calendars failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
@@ -143,77 +313,92 @@ def list_my_calendars() -> Dict[str, object]:
     "If no calendar_name is specified, searches ALL calendars. "
     "Dates accept YYYY-MM-DD or full ISO-8601; defaults to past 7 days through next 30 days. "
     "⚠️ IMPORTANT: Don't search single-day ranges! Always use at least 2-7 days or broader ranges due to iCloud CalDAV limitations. "
-    "Optional timezone_name parameter for date filtering (defaults to UTC if not provided)."
+    "Optional timezone_name parameter for date filtering (defaults to UTC if not provided). "
+    "Set output_format='columns' for a compact {columns, rows} table instead of one object per event."
 ))
+@run_in_thread
 def list_my_events(
     start: Optional[str] = None,
     end: Optional[str] = None,
     calendar_name: Optional[str] = None,
     timezone_name: Optional[str] = None,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    output_format: str = "objects"
 ) -> Dict[str, object]:
     """List events using credentials from environment variables."""
-    logger.info(f"🔧 TOOL CALL: list_my_events(calendar_name='{calendar_name}', start='{start}', end='{end}')")
+    logger.info("🔧 TOOL CALL: list_my_events(calendar_name='%s', start='%s', end='%s')", calendar_name, start, end)
     
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        caldav_client.ensure_connected()
         
         # Parse date range
-        start_dt = ical_utils.parse_iso_datetime(start, timezone_name) or (datetime.now(timezone.utc) - timedelta(days=7))
-        end_dt = ical_utils.parse_iso_datetime(end, timezone_name) or (datetime.now(timezone.utc) + timedelta(days=30))
-        
-        all_events = []
-        
-        if calendar_name:
-            # Search specific calendar
-            cal = caldav_client.find_calendar(calendar_name=calendar_name)
-            events = cal.date_search(start_dt, end_dt)
-            cal_display_name = calendar_name
+        # Default bounds snap outward to whole hours, so repeated calls reuse the cached window
+        anchor = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        start_dt = ical_utils.parse_iso_datetime(start, timezone_name) or (anchor - DEFAULT_LOOKBACK)
+        end_dt = ical_utils.parse_iso_datetime(end, timezone_name) or (anchor + timedelta(hours=1) + DEFAULT_LOOKAHEAD)
+        
+        def iter_events():
+            if calendar_name:
+                # Search specific calendar
+                cal = caldav_client.find_calendar(calendar_name=calendar_name)
+                for fields in caldav_client.list_events_cached(cal, start_dt, end_dt):
+                    # Cached dicts are shared, so tag a copy
+                    yield {**fields, "calendar_name": calendar_name}
+                return
             
-            for ev in events:
-                event_data = ical_utils.parse_event_from_ics(ev)
-                event_data["calendar_name"] = cal_display_name
-                all_events.append(event_data)
-        else:
             # Search all calendars
-            calendars = caldav_client.principal.calendars()
+            calendars = caldav_client._get_cached_calendars()
+            if not calendars:
+                return
             
-            for cal in calendars:
-                cal_name = caldav_client._get_calendar_display_name(cal)
+            def search_calendar(cal):
+                # Name resolution may PROPFIND too, so it runs in the worker alongside the REPORT;
+                # either failing skips just this calendar
+                cal_name = str(cal.url)
                 try:
-                    events = cal.date_search(start_dt, end_dt)
-                    for ev in events:
-                        event_data = ical_utils.parse_event_from_ics(ev)
-                        event_data["calendar_name"] = cal_name
-                        all_events.append(event_data)
+                    cal_name = caldav_client._get_calendar_display_name(cal)
+                    return cal_name, caldav_client.list_events_cached(cal, start_dt, end_dt), None
                 except Exception as e:
-                    logger.warning(f"Failed to search calendar '{cal_name}': {e}")
-                    continue
-        
-        # Sort by start time
-        all_events.sort(key=lambda e: (e.get("start") or "", e.get("summary") or ""))
-        
-        # Apply limit
+                    return cal_name, [], e
+            
+            # Each calendar search is an independent blocking REPORT, so overlap them
+            with ThreadPoolExecutor(max_workers=min(MAX_CALENDAR_WORKERS, len(calendars))) as executor:
+                futures = [executor.submit(search_calendar, cal) for cal in calendars]
+                for future in as_completed(futures):
+                    cal_name, events, error = future.result()
+                    if error is not None:
+                        logger.warning("Failed to search calendar '%s': %s", cal_name, error)
+                        continue
+                    for fields in events:
+                        yield {**fields, "calendar_name": cal_name}
+        
+        # Sort by start time; with a limit, nsmallest keeps only a `limit`-sized heap
+        # while events stream in, instead of holding and sorting every match
         if limit is not None:
-            all_events = all_events[:max(0, int(limit))]
+            all_events = heapq.nsmallest(max(0, int(limit)), iter_events(), key=_event_sort_key)
+        else:
+            all_events = sorted(iter_events(), key=_event_sort_key)
         
-        logger.info(f"✅ list_my_events found {len(all_events)} events")
-        return {
+        logger.info("✅ list_my_events found %d events", len(all_events))
+        result = {
             "success": True,
-            "events": all_events,
             "count": len(all_events),
             "date_range": {
                 "start": start_dt.isoformat(),
                 "end": end_dt.isoformat()
             }
         }
+        if output_format == "columns":
+            # Key names are sent once instead of once per event
+            result["columns"] = list(EVENT_COLUMNS)
+            result["rows"] = [[e.get(c) for c in EVENT_COLUMNS] for e in all_events]
+        else:
+            result["events"] = all_events
+        return result
         
     except Exception as e:
-        logger.error(f"❌ list_my_events failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ list_my_events failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
@@ -229,6 +414,7 @@ def list_my_events(
     "💡 ALARM MODIFICATIONS: To modify alarms on existing events, use the delete+recreate pattern: "
     "1) list_event_alarms to get current alarms, 2) delete_my_event, 3) create_my_event with modified alarm_configs."
 ))
+@run_in_thread
 def create_my_event(
     summary: str,
     start: str,
@@ -243,99 +429,55 @@ def create_my_event(
     alarm_configs: Optional[str] = None
 ) -> Dict[str, object]:
     """Create an event using credentials from environment variables."""
-    logger.info(f"🔧 TOOL CALL: create_my_event(summary='{summary}', start='{start}', end='{end}')")
+    logger.info("🔧 TOOL CALL: create_my_event(summary='%s', start='%s', end='%s')", summary, start, end)
     
+    # Validate input before touching the network
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        event_start, event_end = _parse_event_dates(start, end, all_day, timezone_name)
+    except ValueError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    try:
+        caldav_client.ensure_connected()
         
         cal = caldav_client.find_calendar(calendar_name=calendar_name)
         
-        # Parse dates
-        start_dt = ical_utils.parse_iso_datetime(start, timezone_name)
-        end_dt = ical_utils.parse_iso_datetime(end, timezone_name)
-        
-        if all_day:
-            if len(start.strip()) != 10 or len(end.strip()) != 10:
-                return {
-                    "success": False,
-                    "error": "For all_day events, start and end must be YYYY-MM-DD."
-                }
-            start_date = date.fromisoformat(start.strip())
-            end_date = date.fromisoformat(end.strip())
-        else:
-            if start_dt is None or end_dt is None:
-                return {
-                    "success": False,
-                    "error": "Start and end must be valid ISO-8601 datetimes."
-                }
-        
-        # Create iCalendar
-        ics_cal = ical_utils.create_ics_calendar()
-        evt = IcsEvent()
-        evt.add('uid', f"{uuid4()}@icloud-caldav-mcp")
-        evt.add('summary', summary)
-        evt.add('dtstamp', datetime.now(timezone.utc))
-        
-        if description:
-            evt.add('description', description)
-        if location:
-            evt.add('location', location)
-        
-        if all_day:
-            evt.add('dtstart', start_date)
-            evt.add('dtend', end_date)
-        else:
-            # Ensure timezone-aware datetime
-            if start_dt.tzinfo is None:
-                start_dt = start_dt.replace(tzinfo=timezone.utc)
-            if end_dt.tzinfo is None:
-                end_dt = end_dt.replace(tzinfo=timezone.utc)
-            evt.add('dtstart', start_dt)
-            evt.add('dtend', end_dt)
-        
-        if rrule:
-            evt.add('rrule', rrule)
-        
         # Handle alarms - support both single alarm and multiple alarms
+        alarm_specs = []
         if alarm_configs is not None and alarm_configs.strip() != "":
             # Multiple alarms via JSON config
-            try:
-                parsed_alarm_configs = json.loads(alarm_configs)
-                if isinstance(parsed_alarm_configs, list):
-                    for alarm_config in parsed_alarm_configs:
-                        minutes_before = alarm_config.get('minutes_before', 15)
-                        description = alarm_config.get('description', 'Reminder')
-                        action = alarm_config.get('action', 'DISPLAY')
-                        related = alarm_config.get('related', 'START')
-                        alarm = ical_utils.create_alarm(minutes_before, description, action, related)
-                        evt.add_component(alarm)
-            except Exception:
-                # If JSON parsing fails, ignore alarm_configs
-                pass
+            alarm_specs = _parse_alarm_configs(alarm_configs)
         elif alarm_minutes_before is not None and alarm_minutes_before >= 0:
             # Single alarm via simple parameter
-            alarm = ical_utils.create_alarm(alarm_minutes_before)
-            evt.add_component(alarm)
-        
-        ics_cal.add_component(evt)
-        
-        # Add timezones
-        try:
-            ics_cal.add_missing_timezones()
-        except Exception:
-            pass
-        
-        ics_text = ics_cal.to_ical().decode('utf-8')
+            alarm_specs.append((int(alarm_minutes_before), 'Reminder', 'DISPLAY', 'START'))
+        
+        ics_text = ical_utils.render_event_ics(
+            uid=ical_utils.new_event_uid(),
+            summary=summary,
+            dtstart=event_start,
+            dtend=event_end,
+            dtstamp=datetime.now(timezone.utc),
+            description=description,
+            location=location,
+            rrule=rrule,
+            alarms=alarm_specs
+        )
         
         # Create event
-        created = cal.add_event(ics_text)
+        from caldav.lib.error import NotFoundError
+        try:
+            created = cal.add_event(ics_text)
+        except NotFoundError:
+            # The cached calendar may have been deleted or moved; refresh the lookup and retry once
+            caldav_client.invalidate_calendars_cache()
+            cal = caldav_client.find_calendar(calendar_name=calendar_name)
+            created = cal.add_event(ics_text)
         event_url = str(getattr(created, 'url', None)) if created is not None else None
         
-        logger.info(f"✅ create_my_event created event: {event_url}")
+        logger.info("✅ create_my_event created event: %s", event_url)
         return {
             "success": True,
             "event_url": event_url or "",
@@ -345,7 +487,8 @@ def create_my_event(
         }
         
     except Exception as e:
-        logger.error(f"❌ create_my_event failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ create_my_event failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
@@ -360,6 +503,7 @@ def create_my_event(
     "If uid is provided, the first matching event is updated. "
     "Optional timezone_name parameter for new event times (defaults to UTC if not provided)."
 ))
+@run_in_thread
 def update_my_event(
     event_url: Optional[str] = None,
     uid: Optional[str] = None,
@@ -374,14 +518,10 @@ def update_my_event(
     alarm_minutes_before: Optional[int] = None
 ) -> Dict[str, object]:
     """Update an event using credentials from environment variables."""
-    logger.info(f"🔧 TOOL CALL: update_my_event(event_url='{event_url}', uid='{uid}', summary='{summary}')")
+    logger.info("🔧 TOOL CALL: update_my_event(event_url='%s', uid='%s', summary='%s')", event_url, uid, summary)
     
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        caldav_client.ensure_connected()
         
         if not event_url and not uid:
             return {
@@ -392,108 +532,54 @@ def update_my_event(
         cal = caldav_client.find_calendar(calendar_name=calendar_name)
         event_obj = caldav_client.get_event_by_url_or_uid(cal, event_url, uid)
         
-        # Parse the original event to get existing properties
-        try:
-            original_cal = IcsCalendar.from_ical(ical_utils.get_event_ics_bytes(event_obj))
-            original_event = None
-            for comp in original_cal.walk('vevent'):
-                original_event = comp
-                break
-        except Exception:
-            original_event = None
-        
-        if original_event is None:
-            return {
-                "success": False,
-                "error": "Unable to parse original event for update."
-            }
-        
-        # Create a new event using the SIMPLE approach that works
-        new_cal = ical_utils.create_ics_calendar()
-        new_event = IcsEvent()
-        
-        # Copy essential properties (UID, timestamps, dates)
-        if original_event.get('uid'):
-            new_event.add('uid', original_event.get('uid'))
-        if original_event.get('dtstamp'):
-            new_event.add('dtstamp', original_event.get('dtstamp').dt)
-        
-        # Set dates (use new ones if provided, otherwise keep originals)
-        if start is not None:
-            new_start = ical_utils.parse_iso_datetime(start, timezone_name)
-            if new_start:
-                new_event.add('dtstart', new_start)
-        elif original_event.get('dtstart'):
-            new_event.add('dtstart', original_event.get('dtstart').dt)
-            
-        if end is not None:
-            new_end = ical_utils.parse_iso_datetime(end, timezone_name)
-            if new_end:
-                new_event.add('dtend', new_end)
-        elif original_event.get('dtend'):
-            new_event.add('dtend', original_event.get('dtend').dt)
-        
-        # Set content (use new values if provided, otherwise keep originals)
-        if summary is not None:
-            new_event.add('summary', summary)
-        elif original_event.get('summary'):
-            new_event.add('summary', str(original_event.get('summary')))
-            
-        if description is not None:
-            new_event.add('description', description)
-        elif original_event.get('description'):
-            new_event.add('description', str(original_event.get('description')))
-            
-        if location is not None:
-            new_event.add('location', location)
-        elif original_event.get('location'):
-            new_event.add('location', str(original_event.get('location')))
-            
-        if rrule is not None:
-            new_event.add('rrule', rrule)
-        elif original_event.get('rrule'):
-            new_event.add('rrule', str(original_event.get('rrule')))
-        
-        # Increment sequence number
-        sequence = ical_utils.get_sequence_number(original_event)
-        new_event.add('sequence', sequence)
-        
-        # Copy existing alarms (skip new alarm functionality for now - too complex)
-        if original_event:
-            for a in original_event.walk('valarm'):
-                try:
-                    from icalendar import Alarm as IcsAlarm
-                    cloned = IcsAlarm.from_ical(a.to_ical())
-                    new_event.add_component(cloned)
-                except Exception:
-                    new_event.add_component(a)
-        
-        new_cal.add_component(new_event)
-        
-        # Add timezones
-        try:
-            new_cal.add_missing_timezones()
-        except Exception:
-            pass
-        
-        # Save the updated event
-        new_ics_text = new_cal.to_ical().decode('utf-8')
-        logger.info(f"🔍 Generated iCalendar data for update:")
-        logger.info(new_ics_text)
-        
-        event_obj.data = new_ics_text
-        try:
-            logger.info(f"🔄 Attempting to save event: {event_obj.url}")
-            event_obj.save()
-            logger.info(f"✅ Successfully saved updated event to iCloud")
-        except Exception as save_error:
-            logger.error(f"❌ Failed to save event update: {type(save_error).__name__}: {str(save_error)}")
-            return {
-                "success": False,
-                "error": f"Failed to save event update: {str(save_error)}"
-            }
+        ics_bytes = ical_utils.get_event_ics_bytes(event_obj)
+        text_fields = {
+            name: value for name, value in (('SUMMARY', summary), ('DESCRIPTION', description), ('LOCATION', location))
+            if value is not None
+        }
+        patched = None
+        if text_fields and start is None and end is None and rrule is None:
+            # Retitles and location/description edits rewrite those lines directly,
+            # skipping icalendar's parse and re-serialization of the whole event
+            patched = ical_utils.patch_event_text(ics_bytes, text_fields)
+        
+        if patched is not None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Patched iCalendar data for update:\n%s", patched.decode('utf-8'))
+            try:
+                logger.info("🔄 Attempting to save patched event: %s", event_obj.url)
+                caldav_client.put_event_data(event_obj, patched)
+                logger.info("✅ Successfully saved updated event to iCloud")
+            except Exception as save_error:
+                logger.error("❌ Failed to save event update: %s: %s", type(save_error).__name__, save_error)
+                return {
+                    "success": False,
+                    "error": f"Failed to save event update: {str(save_error)}"
+                }
+        else:
+            original_cal = _apply_event_update(ics_bytes, summary, start, end, description, location, rrule, timezone_name)
+            if original_cal is None:
+                return {
+                    "success": False,
+                    "error": "Unable to parse original event for update."
+                }
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Generated iCalendar data for update:\n%s", original_cal.to_ical().decode('utf-8'))
+            # Handing caldav the parsed calendar serializes it once for the PUT, skipping a
+            # str round-trip and vcal.fix()'s rescan of text we generated ourselves
+            event_obj.icalendar_instance = original_cal
+            try:
+                logger.info("🔄 Attempting to save event: %s", event_obj.url)
+                event_obj.save()
+                logger.info("✅ Successfully saved updated event to iCloud")
+            except Exception as save_error:
+                logger.error("❌ Failed to save event update: %s: %s", type(save_error).__name__, save_error)
+                return {
+                    "success": False,
+                    "error": f"Failed to save event update: {str(save_error)}"
+                }
         
-        logger.info(f"✅ update_my_event updated event: {event_url or uid}")
+        logger.info("✅ update_my_event updated event: %s", event_url or uid)
         return {
             "success": True,
             "event_url": event_url or "",
@@ -508,7 +594,8 @@ def update_my_event(
         }
         
     except Exception as e:
-        logger.error(f"❌ update_my_event failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ update_my_event failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
@@ -516,53 +603,93 @@ def update_my_event(
 
 
 @mcp.tool(description="Delete an event by its CalDAV event URL using environment variables.")
+@run_in_thread
 def delete_my_event(event_url: str) -> Dict[str, object]:
     """Delete an event using credentials from environment variables."""
-    logger.info(f"🔧 TOOL CALL: delete_my_event(event_url='{event_url}')")
+    logger.info("🔧 TOOL CALL: delete_my_event(event_url='%s')", event_url)
     
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        caldav_client.ensure_connected()
+        _delete_event(event_url)
         
-        import caldav
-        ev = caldav.Event(client=caldav_client.client, url=event_url)
-        ev.delete()
-        
-        logger.info(f"✅ delete_my_event deleted event: {event_url}")
+        logger.info("✅ delete_my_event deleted event: %s", event_url)
         return {
             "success": True,
             "event_url": event_url
         }
         
     except Exception as e:
-        logger.error(f"❌ delete_my_event failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ delete_my_event failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
         }
 
 
+@mcp.tool(description=(
+    "Delete several events by their CalDAV event URLs in one call; the deletes run concurrently. "
+    "Returns a per-URL result so partial failures can be retried."
+))
+@run_in_thread
+def delete_my_events(event_urls: List[str]) -> Dict[str, object]:
+    """Delete many events concurrently using credentials from environment variables."""
+    logger.info("🔧 TOOL CALL: delete_my_events(%d urls)", len(event_urls))
+    
+    try:
+        caldav_client.ensure_connected()
+    except Exception as e:
+        logger.error("❌ delete_my_events failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    urls = list(dict.fromkeys(event_urls))
+    results: Dict[str, Optional[Exception]] = {}
+    if urls:
+        # Each DELETE is an independent blocking request, so overlap them on the pooled session
+        with ThreadPoolExecutor(max_workers=min(MAX_DELETE_WORKERS, len(urls))) as executor:
+            futures = {executor.submit(_delete_event, url): url for url in urls}
+            for future in as_completed(futures):
+                results[futures[future]] = future.exception()
+    
+    errors = [e for e in results.values() if e is not None]
+    if errors:
+        logger.warning("⚠️ delete_my_events failed for %d of %d events", len(errors), len(urls))
+        # One dead session is enough to explain every failure, so reset it once; a
+        # 404 listed first must not hide a transport or auth error behind it
+        caldav_client.invalidate_on_error(
+            next((e for e in errors if caldav_client.is_session_error(e)), errors[0])
+        )
+    logger.info("✅ delete_my_events deleted %d events", len(urls) - len(errors))
+    return {
+        "success": not errors,
+        "deleted": len(urls) - len(errors),
+        "results": [
+            {"event_url": url, "success": True} if results[url] is None
+            else {"event_url": url, "success": False, "error": str(results[url])}
+            for url in urls
+        ]
+    }
+
+
 @mcp.tool(description=(
     "List VALARMs for an event by URL or UID. Returns alarm UID, Apple X-WR-ALARMUID, "
     "trigger (normalized minutes_before when relative), RELATED, ACTION, and DESCRIPTION."
 ))
+@run_in_thread
 def list_event_alarms(
     event_url: Optional[str] = None,
     uid: Optional[str] = None,
     calendar_name: Optional[str] = None
 ) -> Dict[str, object]:
     """List alarms for an event using credentials from environment variables."""
-    logger.info(f"🔧 TOOL CALL: list_event_alarms(event_url='{event_url}', uid='{uid}')")
+    logger.info("🔧 TOOL CALL: list_event_alarms(event_url='%s', uid='%s')", event_url, uid)
     
     try:
-        if not caldav_client.connect():
-            return {
-                "success": False,
-                "error": "Failed to connect to CalDAV server"
-            }
+        caldav_client.ensure_connected()
         
         if not event_url and not uid:
             return {
@@ -572,34 +699,9 @@ def list_event_alarms(
         
         cal = caldav_client.find_calendar(calendar_name=calendar_name)
         event_obj = caldav_client.get_event_by_url_or_uid(cal, event_url, uid)
-        cal_ics = IcsCalendar.from_ical(ical_utils.get_event_ics_bytes(event_obj))
-        
-        alarms = []
-        for comp in cal_ics.walk('valarm'):
-            trigger_prop = comp.get('trigger')
-            minutes_before = None
-            related = None
-            if trigger_prop is not None:
-                try:
-                    from datetime import timedelta
-                    value = getattr(trigger_prop, 'dt', trigger_prop)
-                    rel_params = getattr(trigger_prop, 'params', {})
-                    related = str(rel_params.get('RELATED', 'START')) if rel_params is not None else 'START'
-                    if isinstance(value, timedelta):
-                        minutes_before = int(abs(value.total_seconds()) // 60)
-                except Exception:
-                    pass
-            
-            alarms.append({
-                "uid": str(comp.get('uid')) if comp.get('uid') is not None else None,
-                "x_wr_alarmuid": str(comp.get('X-WR-ALARMUID')) if comp.get('X-WR-ALARMUID') is not None else None,
-                "minutes_before": minutes_before,
-                "related": related,
-                "action": str(comp.get('action')) if comp.get('action') is not None else None,
-                "description": str(comp.get('description')) if comp.get('description') is not None else None
-            })
+        alarms = ical_utils.parse_alarms_from_ics(ical_utils.get_event_ics_bytes(event_obj))
         
-        logger.info(f"✅ list_event_alarms found {len(alarms)} alarms")
+        logger.info("✅ list_event_alarms found %d alarms", len(alarms))
         return {
             "success": True,
             "alarms": alarms,
@@ -607,27 +709,23 @@ def list_event_alarms(
         }
         
     except Exception as e:
-        logger.error(f"❌ list_event_alarms failed: {type(e).__name__}: {str(e)}")
+        logger.error("❌ list_event_alarms failed: %s: %s", type(e).__name__, e)
+        caldav_client.invalidate_on_error(e)
         return {
             "success": False,
             "error": str(e)
         }
 
 
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> JSONResponse:
+    """Liveness probe for load balancers; touches neither CalDAV nor MCP sessions."""
+    return JSONResponse({"status": "ok"})
 
 
-if __name__ == "__main__":
-    port = int(os.environ.get("PORT", 8000))
-    host = "0.0.0.0"
-    
-    logger.info("🚀" + "="*77)
-    logger.info(f"🚀 Starting iCloud CalDAV MCP Server")
-    logger.info(f"🚀 Server URL: http://{host}:{port}")
-    logger.info(f"🚀 MCP Endpoint: http://{host}:{port}/mcp")
-    logger.info(f"🚀 Environment: {os.environ.get('ENVIRONMENT', 'development')}")
-    logger.info(f"🚀 Logging level: {logger.level}")
-    
-    # Validate environment variables on startup
+def run_startup_check() -> None:
+    """Test the CalDAV credentials once and record the result for get_startup_health."""
+    startup_health["status"] = "running"
     try:
         test_result = caldav_client.test_connection()
         if test_result.get("success"):
@@ -638,9 +736,35 @@ if __name__ == "__main__":
             logger.warning(f"⚠ Warning: {test_result.get('error')}")
             logger.warning("  Server will start but tools may fail until credentials are fixed.")
     except Exception as e:
+        test_result = {"success": False, "error": str(e)}
         logger.warning(f"⚠ Warning: Could not test connection: {e}")
         logger.warning("  Server will start but tools may fail until credentials are fixed.")
+    startup_health.update(status="done", checked_at=datetime.now(timezone.utc).isoformat(), result=test_result)
+
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 8000))
+    host = "0.0.0.0"
+    
+    logger.info("🚀" + "="*77)
+    logger.info(f"🚀 Starting iCloud CalDAV MCP Server")
+    logger.info(f"🚀 Server URL: http://{host}:{port}")
+    logger.info(f"🚀 MCP Endpoint: http://{host}:{port}/mcp")
+    logger.info(f"🚀 Environment: {os.environ.get('ENVIRONMENT', 'development')}")
+    logger.info(f"🚀 Logging level: {logger.level}")
+    logger.info(f"🚀 Session mode: {'stateless' if STATELESS_HTTP else 'stateful'}")
+    
+    # Validate environment variables on startup (blocking, in the background, or not at all)
+    if STARTUP_HEALTHCHECK == "background":
+        logger.info("🚀 Startup connection check: running in background")
+        threading.Thread(target=run_startup_check, name="startup-healthcheck", daemon=True).start()
+    elif STARTUP_HEALTHCHECK == "off":
+        logger.info("🚀 Startup connection check: skipped")
+        # Still open the TLS connection off the boot path so the first tool call skips the handshake
+        threading.Thread(target=caldav_client.warm_up, name="caldav-warmup", daemon=True).start()
+    else:
+        run_startup_check()
     
     logger.info("🚀" + "="*77)
 
-    mcp.run(transport="http", host=host, port=port, stateless_http=True)
+    mcp.run(transport="http", host=host, port=port, stateless_http=STATELESS_HTTP)